@@ -1,17 +1,25 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-import re
-from datetime import datetime, timedelta
-import requests
-import difflib
 from data_loader import (load_nhl_data, get_player_game_log, load_schedule, load_weekly_leaders, 
-                         get_weekly_schedule_matrix, load_nhl_news, fetch_espn_league_data, 
-                         fetch_nhl_standings, fetch_nhl_boxscore)
+                         get_weekly_schedule_matrix, load_nhl_news, fetch_espn_leagues, 
+                         fetch_nhl_standings, fetch_nhl_boxscore, prefetch, fantasy_points,
+                         build_player_table)
+from assets import local_asset, team_logo
+from live import tracker, last_night_digest
+from valuation import SKATER_CATEGORIES, GOALIE_CATEGORIES, category_values
+from waivers import POSITIONS, get_waiver_index, roster_needs
+from playoffs import playoff_odds
 
 st.set_page_config(layout="wide", page_title="Slapshot Stats")
 st.title("🏒 Slapshot Stats")
 
+# --- PAGES ---
+# Only the selected page is built on each run; widgets inside fragments rerun just their own section.
+PAGE_HOME, PAGE_ANALYTICS, PAGE_TOOLS, PAGE_FANTASY = "🏠 Home", "📊 Data & Analytics", "🛠️ Fantasy Tools", "⚔️ My Fantasy Team"
+PAGE_LEAGUE, PAGE_STANDINGS, PAGE_GAMECENTER, PAGE_SCOREBOARD = "🏆 My League", "📊 League Standings", "🥅 Game Center", "📅 Scoreboard"
+PAGES = [PAGE_HOME, PAGE_ANALYTICS, PAGE_TOOLS, PAGE_FANTASY, PAGE_LEAGUE, PAGE_STANDINGS, PAGE_GAMECENTER, PAGE_SCOREBOARD]
+
 # --- SESSION STATE ---
 if 'my_roster' not in st.session_state: st.session_state.my_roster = []
 if "trade_send" not in st.session_state: st.session_state.trade_send = []
@@ -20,6 +28,19 @@ if "espn_standings" not in st.session_state: st.session_state.espn_standings = p
 if "league_rosters" not in st.session_state: st.session_state.league_rosters = {}
 if "league_name" not in st.session_state: st.session_state.league_name = "League Rosters"
 if "selected_game_id" not in st.session_state: st.session_state.selected_game_id = None
+if "nav" not in st.session_state: st.session_state.nav = PAGE_HOME
+
+# --- PREFETCH ---
+# Start every Home dataset at once, before anything renders; each section waits on its own result.
+# "nav" already holds the page this run will build, so other pages don't pay for it.
+home_data = None
+if st.session_state.nav == PAGE_HOME:
+    home_data = prefetch({
+        'schedule': load_schedule,
+        'news': load_nhl_news,
+        'sos': get_weekly_schedule_matrix,
+        'weekly': load_weekly_leaders,
+    })
 
 # --- CALLBACKS ---
 def add_player_from_select(side):
@@ -37,8 +58,15 @@ def remove_player(player, side):
     if player in target:
         target.remove(player)
 
-def set_game_id(g_id):
+def roster_id(p):
+    """NHL player ID the league loader resolved for an ESPN roster entry, or None if it didn't match."""
+    try: pid = int(float(p.get('ID', 0)))
+    except: return None
+    return pid or None
+
+def open_game(g_id):
     st.session_state.selected_game_id = g_id
+    st.session_state.nav = PAGE_GAMECENTER
 
 # --- CSS ---
 st.markdown("""
@@ -137,318 +165,475 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+
+# ================= PAGE: HOME =================
+def render_home(home_data):
+    # News
+    news = home_data['news'].result()
+    if news:
+        with st.container(border=True):
+            cols = st.columns(4)
+            for i, article in enumerate(news[:4]):
+                with cols[i]:
+                    img_html = f'<img src="{local_asset(article["image"])}" class="news-img-v">' if article['image'] else ''
+                    st.markdown(f"""
+                    <div class="news-card-v">
+                        {img_html}
+                        <div class="news-content-v">
+                            <a href="{article['link']}" target="_blank" class="news-title-v">{article['headline']}</a>
+                            <div class="news-desc-v">{article['description']}</div>
+                        </div>
+                    </div>""", unsafe_allow_html=True)
+    st.divider()
+
+    render_ticker(home_data)
+
+    st.divider()
+    col_sos, col_news = st.columns([3, 2])
+    with col_sos:
+        st.header("💪 Strength of Schedule")
+        with st.spinner("Calculating..."):
+            sos_matrix, standings = home_data['sos'].result()
+        if not sos_matrix.empty and standings:
+            sos_display = sos_matrix.copy()
+            sos_display.index = sos_display.index.map(team_logo)
+            sos_display.reset_index(inplace=True)
+            sos_display.rename(columns={'index': 'Team'}, inplace=True) 
+            day_cols = [c for c in sos_display.columns if c != 'Team']
+            for col in day_cols:
+                def transform_cell(val):
+                    if not val or val == "": return None
+                    parts = val.split(" ")
+                    if len(parts) > 1: return team_logo(parts[1])
+                    return None
+                sos_display[col] = sos_display[col].apply(transform_cell)
+            column_config = {"Team": st.column_config.ImageColumn("Team", width="small")}
+            for col in day_cols: column_config[col] = st.column_config.ImageColumn(col, width="small")
+            st.dataframe(sos_display, use_container_width=True, height=500, column_config=column_config, hide_index=True)
+
+    with col_news:
+        st.header("🔥 Hot This Week")
+        df_weekly = home_data['weekly'].result()
+        if not df_weekly.empty:
+            def make_mini_chart(data, x_col, y_col, color, title):
+                sorted_data = data.sort_values(y_col, ascending=False).head(5)
+                chart = alt.Chart(sorted_data).mark_bar(cornerRadiusEnd=4).encode(x=alt.X(f'{y_col}:Q', title=None), y=alt.Y(f'{x_col}:N', sort='-x', title=None), color=alt.value(color), tooltip=[x_col, y_col]).properties(title=title, height=200)
+                text = chart.mark_text(align='left', dx=2).encode(text=f'{y_col}:Q')
+                return (chart + text)
+            st.altair_chart(make_mini_chart(df_weekly, 'Player', 'G', '#ff4b4b', 'Top Goal Scorers'), use_container_width=True)
+            st.altair_chart(make_mini_chart(df_weekly, 'Player', 'Pts', '#0083b8', 'Top Points Leaders'), use_container_width=True)
+
+@st.fragment
+def render_ticker(home_data):
+    # TICKER (LIVE / TODAY)
+    st.subheader("Live & Recent Games")
+    games_yesterday, games_today, _ = home_data['schedule'].result()
+
+    ticker_games = []
+    if games_today: ticker_games.extend(games_today)
+    if games_yesterday: ticker_games.extend(games_yesterday)
+    
+    # Sort Ticker: Live -> Final -> Future
+    def sort_key(g):
+        if g.get('is_live'): return 0
+        if 'Final' in g.get('time', ''): return 1
+        return 2
+    ticker_games.sort(key=sort_key)
+    
+    if ticker_games:
+        # Render Ticker Grid
+        cols = st.columns(min(len(ticker_games), 8)) # Up to 8 columns
+        for i, game in enumerate(ticker_games[:8]): # Show top 8 relevant games
+            with cols[i]:
+                status_color = "status-live" if game.get("is_live") else ""
+                st.markdown(f"""
+                <div class="ticker-card">
+                    <div class="ticker-team-row">
+                        <img src="{local_asset(game['away_logo'])}" class="ticker-logo">
+                        <span>{game['away']}</span>
+                        <span class="ticker-score">{game.get('away_score', '')}</span>
+                    </div>
+                    <div class="ticker-team-row">
+                        <img src="{local_asset(game['home_logo'])}" class="ticker-logo">
+                        <span>{game['home']}</span>
+                        <span class="ticker-score">{game.get('home_score', '')}</span>
+                    </div>
+                    <div class="ticker-status {status_color}">{game['time']}</div>
+                </div>""", unsafe_allow_html=True)
+                
+                # open_game switches the page, which needs a full app rerun
+                if st.button("Stats", key=f"tick_{game['id']}", on_click=open_game, args=(game['id'],)):
+                    st.rerun()
+    else:
+        st.info("No active or recent games to display.")
+    
+    if st.button("📅 View Full Scoreboard"):
+         # Just a visual cue, user clicks the tab
+         st.info("Select '📅 Scoreboard' above to see all games.")
+
+# ================= PAGE: DATA & ANALYTICS =================
+def render_analytics(df):
+    render_breakout(df[df['PosType'] == 'Skater'].sort_values('Pts', ascending=False))
+    st.divider()
+    st.subheader("League Summary")
+    st.dataframe(df, use_container_width=True, hide_index=True, height=600)
+
+@st.fragment
+def render_breakout(skater_options):
+    st.header("📈 Breakout Detector")
+    selected_player_name = st.selectbox("Select Player:", skater_options['Player'].unique())
+    if selected_player_name:
+        pid = dict(zip(skater_options['Player'], skater_options['ID']))[selected_player_name]
+        game_log = get_player_game_log(pid)
+        if not game_log.empty:
+            game_log['Rolling Points'] = game_log['points'].rolling(window=5, min_periods=1).mean()
+            chart_data = game_log[['gameDate', 'points', 'Rolling Points']].set_index('gameDate')
+            st.line_chart(chart_data, color=["#d3d3d3", "#ff4b4b"])
+
+# ================= PAGE: FANTASY TOOLS =================
+def render_tools(df, value_col):
+    st.header("⚖️ Trade Analyzer")
+    if 'espn_standings' in st.session_state and not st.session_state.espn_standings.empty:
+        st.subheader("🏆 League Standings")
+        st.dataframe(st.session_state.espn_standings, use_container_width=True, hide_index=True)
+
+    # Category leagues compare summed z-score Value, points leagues rest-of-season FP
+    # Keyed by NHL ID so same-named players stay distinct
+    by_id = df.drop_duplicates('ID').set_index('ID')
+    values = by_id[value_col].fillna(0)
+    player_label = lambda pid: f"{by_id.at[pid, 'Player']} ({by_id.at[pid, 'Pos']})" if pid in by_id.index else str(pid)
+    players = by_id.sort_values('Player').index.tolist()
+    col_send, col_recv = st.columns(2)
+    totals = {}
+    for col, side, label in ((col_send, 'send', "📤 You Send"), (col_recv, 'recv', "📥 You Receive")):
+        key = "sb_send" if side == 'send' else "sb_recv"
+        target = st.session_state.trade_send if side == 'send' else st.session_state.trade_recv
+        with col:
+            st.subheader(label)
+            st.selectbox("Add Player", players, index=None, key=key, format_func=player_label, on_change=add_player_from_select, args=(side,))
+            for player in target:
+                c1, c2 = st.columns([4, 1])
+                c1.write(f"{player_label(player)} — {values.get(player, 0):.2f}")
+                c2.button("✖", key=f"rm_{side}_{player}", on_click=remove_player, args=(player, side))
+            totals[side] = sum(values.get(p, 0) for p in target)
+            st.metric(f"Total {value_col}", f"{totals[side]:.2f}")
+
+    if st.session_state.trade_send and st.session_state.trade_recv:
+        diff = totals['recv'] - totals['send']
+        css = "trade-win" if diff >= 0 else "trade-loss"
+        verdict = "You win this trade" if diff >= 0 else "You lose this trade"
+        st.markdown(f'<div class="{css}"><h3>{verdict}</h3>{value_col} {diff:+.2f}</div>', unsafe_allow_html=True)
+
+@st.fragment
+def render_waivers(league_id, weights, owned, df):
+    st.header("🧲 Waiver Wire")
+    if not owned:
+        st.info("Load an ESPN league to rank its free agents.")
+        return
+    # Shared per-league index; syncing only moves players whose ownership changed
+    index = get_waiver_index(league_id, weights)
+    index.sync(owned)
+    cols = ['Player', 'Team', 'Pos', 'Recent FP/G', 'Season FP/G', 'Games Left', 'Score']
+    c_filter, c_k = st.columns([3, 1])
+    with c_filter: positions = st.multiselect("Positions", POSITIONS, default=POSITIONS, key="waiver_positions")
+    with c_k: k = st.number_input("Show", min_value=5, max_value=50, value=15, step=5, key="waiver_k")
+    st.dataframe(index.top(int(k), positions)[cols], use_container_width=True, hide_index=True)
+
+    needs = roster_needs(df.loc[df['Player'].isin(st.session_state.my_roster), 'Pos'].tolist()) if st.session_state.my_roster else {}
+    if needs:
+        st.subheader("Fill Your Open Slots")
+        for pos, picks in index.for_needs(needs).items():
+            st.markdown(f"**{pos}** — {needs[pos]} open")
+            st.dataframe(picks[cols], use_container_width=True, hide_index=True)
+
+# ================= PAGE: MY FANTASY TEAM =================
+@st.fragment
+def render_fantasy(df, weights):
+    st.header("⚔️ My Roster")
+    col_up, _ = st.columns([1, 2])
+    with col_up: uploaded_file = st.file_uploader("📂 Load Saved Roster (CSV)", type=["csv"])
+    time_filter = st.selectbox("Select Time Frame", ["Season (2025/26)", "Last 7 Days", "Last 15 Days", "Last 30 Days"], key="time_filter")
+    if uploaded_file:
+        try:
+            udf = pd.read_csv(uploaded_file)
+            if "Player" in udf.columns: st.session_state.my_roster = [p for p in udf["Player"] if p in df['Player'].values]
+        except: pass
+    selected_players = st.multiselect("Search Players:", df['Player'].unique(), default=st.session_state.my_roster)
+    st.session_state.my_roster = selected_players
+    if selected_players:
+        base_team_df = df[df['Player'].isin(selected_players)].copy()
+        display_df = base_team_df 
+        if time_filter != "Season (2025/26)":
+            days_map = {"Last 7 Days": 7, "Last 15 Days": 15, "Last 30 Days": 30}
+            days = days_map.get(time_filter, 0)
+            start_date = pd.Timestamp.now().normalize() - pd.Timedelta(days=days)
+            with st.spinner(f"Fetching stats..."):
+                recent_stats = []
+                for _, row in base_team_df.iterrows():
+                    pid = row['ID']
+                    logs = get_player_game_log(pid) 
+                    if not logs.empty:
+                        mask = logs['gameDate'] >= start_date
+                        recent = logs[mask]
+                        stat_dict = {
+                            'ID': pid, 'Player': row['Player'], 'Team': row['Team'], 'Pos': row['Pos'], 'GP': len(recent),
+                            'G': recent['goals'].sum() if 'goals' in recent else 0, 'A': recent['assists'].sum() if 'assists' in recent else 0,
+                            'Pts': recent['points'].sum() if 'points' in recent else 0, 'SOG': recent['shots'].sum() if 'shots' in recent else 0,
+                            'PPP': recent['powerPlayPoints'].sum() if 'powerPlayPoints' in recent else 0, 'Hits': recent['hits'].sum() if 'hits' in recent else 0,
+                            'BkS': recent['blockedShots'].sum() if 'blockedShots' in recent else 0, 'PIM': recent['pim'].sum() if 'pim' in recent else 0,
+                            'W': len(recent[recent['decision'] == 'W']) if 'decision' in recent else 0, 'SO': recent['shutouts'].sum() if 'shutouts' in recent else 0,
+                            'Svs': recent['saves'].sum() if 'saves' in recent else 0, 'GA': recent['goalsAgainst'].sum() if 'goalsAgainst' in recent else 0,
+                            'L': len(recent[recent['decision'] == 'L']) if 'decision' in recent else 0, 'OTL': len(recent[recent['decision'] == 'OT']) if 'decision' in recent else 0,
+                            'SHP': recent['shorthandedPoints'].sum() if 'shorthandedPoints' in recent else 0
+                        }
+                        recent_stats.append(stat_dict)
+                if recent_stats:
+                    display_df = pd.DataFrame(recent_stats)
+                    display_df['FP'] = fantasy_points(display_df, weights)
+                    extra = [c for c in ('TOI', 'Value', 'Value%') if c in df.columns]
+                    if extra: display_df = display_df.merge(df[['ID'] + extra], on='ID', how='left')
+        if not display_df.empty:
+            st.dataframe(display_df, use_container_width=True, hide_index=True)
+
+# ================= PAGE: LEAGUE ROSTERS =================
+def render_league(df, value_col):
+    st.header(f"Rosters for {st.session_state.league_name}")
+    if st.session_state.get('league_rosters'):
+        roster_dict = st.session_state.league_rosters
+        # Resolved NHL IDs, not ESPN names: fuzzy-matched and same-named players get their own value
+        values = df.drop_duplicates('ID').set_index('ID')[value_col].fillna(0)
+        totals = pd.DataFrame([{'Team': t, value_col: round(sum(values.get(roster_id(p), 0) for p in r), 2)} for t, r in roster_dict.items()])
+        st.dataframe(totals.sort_values(value_col, ascending=False), use_container_width=True, hide_index=True)
+        team_names = list(roster_dict.keys())
+        cols = st.columns(4)
+        for i, team_name in enumerate(team_names):
+            roster = roster_dict[team_name]
+            team_df = pd.DataFrame(roster)
+            team_df[value_col] = [round(values[pid], 2) if pid in values.index else None for pid in map(roster_id, roster)]
+            with cols[i % 4]:
+                st.subheader(team_name)
+                st.dataframe(team_df[['Name', 'NHLTeam', value_col]], use_container_width=True, hide_index=True)
+    else: st.info("Enter League ID.")
+
+# ================= PAGE: NHL STANDINGS =================
+@st.fragment
+def render_standings():
+    st.header("🏒 NHL Standings")
+    view_type = st.radio("Select View", ('League (Overall)', 'Conference', 'Division'), horizontal=True)
+    standings_data = fetch_nhl_standings(view_type.split(' ')[0])
+    if not standings_data.empty:
+        standings_data['Team Icon'] = standings_data.apply(lambda row: f"<img src='{local_asset(row['Icon'])}' width='30'> {row['Team']}", axis=1)
+        st.markdown(standings_data[['Rank', 'Team Icon', 'GP', 'W', 'L', 'OTL', 'PTS']].to_html(escape=False, index=False), unsafe_allow_html=True)
+
+    st.subheader("🎲 Playoff Odds")
+    st.caption("20,000 simulated seasons of the remaining schedule; refreshed when a game goes final.")
+    with st.spinner("Simulating season..."):
+        odds = playoff_odds()
+    if not odds.empty:
+        c_east, c_west = st.columns(2)
+        for col, (conf, group) in zip((c_east, c_west), odds.groupby('Conference')):
+            with col:
+                st.markdown(f"**{conf}**")
+                st.dataframe(group[['Team', 'PTS', 'Proj PTS', 'Playoffs %', 'Division %', 'Top Seed %']],
+                             use_container_width=True, hide_index=True)
+    else:
+        st.info("Playoff odds are unavailable until the remaining schedule loads.")
+
+# ================= PAGE: GAME CENTER =================
+def render_gamecenter(weights, rostered):
+    render_live_points(weights, rostered)
+    if st.session_state.selected_game_id:
+        g_id = st.session_state.selected_game_id
+        st.header("🥅 Game Center")
+        box_data = fetch_nhl_boxscore(g_id)
+        if box_data:
+            home = box_data.get('homeTeam', {})
+            away = box_data.get('awayTeam', {})
+            c1, c2, c3 = st.columns([1, 0.2, 1])
+            with c1: st.markdown(f"<div style='text-align:center'><img src='{local_asset(away.get('logo', ''))}' width='80'><h2>{away.get('name', {}).get('default', 'Away')}</h2><h3>{away.get('score', 0)}</h3></div>", unsafe_allow_html=True)
+            with c2: st.markdown("<h2 style='text-align:center; padding-top:40px'>VS</h2>", unsafe_allow_html=True)
+            with c3: st.markdown(f"<div style='text-align:center'><img src='{local_asset(home.get('logo', ''))}' width='80'><h2>{home.get('name', {}).get('default', 'Home')}</h2><h3>{home.get('score', 0)}</h3></div>", unsafe_allow_html=True)
+            st.divider()
+            st.subheader("Box Score")
+            def parse_stats(team_data):
+                rows = []
+                # Logic handles both 'landing' and 'boxscore' structures
+                stats_source = box_data.get('playerByGameStats', {}).get('awayTeam' if team_data == away else 'homeTeam', {})
+                if not stats_source and 'boxscore' in box_data:
+                    stats_source = box_data['boxscore'].get('playerByGameStats', {}).get('awayTeam' if team_data == away else 'homeTeam', {})
+
+                players = stats_source.get('forwards', []) + stats_source.get('defense', [])
+                for p in players:
+                    rows.append({"Player": p.get('name', {}).get('default'), "G": p.get('goals', 0), "A": p.get('assists', 0), "Pts": p.get('points', 0), "SOG": p.get('shots', 0), "TOI": p.get('toi', '00:00')})
+                return pd.DataFrame(rows) if rows else pd.DataFrame(columns=["Player", "G", "A", "Pts", "SOG", "TOI"])
+
+            c_away, c_home = st.columns(2)
+            with c_away: st.dataframe(parse_stats(away), hide_index=True, use_container_width=True)
+            with c_home: st.dataframe(parse_stats(home), hide_index=True, use_container_width=True)
+        else: st.error("Could not load box score.")
+    else: st.info("👈 Select a game.")
+
+@st.fragment(run_every=60)
+def render_live_points(weights, rostered):
+    _, games_today, _ = load_schedule()
+    live_ids = [g['id'] for g in games_today if g.get('is_live')]
+    if not live_ids: return
+    st.header("📡 Live Fantasy Points")
+    # Shared tracker: only play-by-play events since the last refresh are applied
+    tracker.refresh(live_ids)
+    if not rostered:
+        st.info("Load a league or pick your roster to see live fantasy points.")
+        return
+    live_df = tracker.live_points(weights, rostered, live_ids)
+    if live_df.empty:
+        st.caption("None of your rostered players are in a live game.")
+        return
+    cols = ['Player', 'Fantasy Team', 'Team', 'Pos', 'FP', 'G', 'A', 'PPP', 'SHP', 'SOG', 'Hits', 'BkS', 'Svs', 'GA']
+    st.dataframe(live_df[cols], use_container_width=True, hide_index=True)
+    with st.expander("Fantasy team totals"):
+        st.dataframe(live_df.groupby('Fantasy Team', as_index=False)['FP'].sum().sort_values('FP', ascending=False), use_container_width=True, hide_index=True)
+    st.divider()
+
+# ================= PAGE: FULL SCOREBOARD =================
+def render_scoreboard(schedule, weights, rostered):
+    st.header("📅 Full Scoreboard")
+    games_yesterday, games_today, games_tomorrow = schedule
+    render_last_night(weights, rostered)
+    c_yest, c_today, c_tom = st.columns(3)
+    def render_simple(game):
+        st.markdown(f"**{game['away']} {game['away_score']}** @ **{game['home']} {game['home_score']}** ({game['time']})")
+        st.button("Stats", key=f"sb_btn_{game['id']}", on_click=open_game, args=(game['id'],))
+
+    with c_yest:
+        st.subheader("Yesterday")
+        for g in games_yesterday: render_simple(g)
+    with c_today:
+        st.subheader("Today")
+        for g in games_today: render_simple(g)
+    with c_tom:
+        st.subheader("Tomorrow")
+        for g in games_tomorrow: render_simple(g)
+
+def render_last_night(weights, rostered):
+    # Shared daily table of every final box score; only the FP weighting is per user
+    digest, pending = last_night_digest()
+    if digest.empty: return
+    st.subheader("🌙 Last Night")
+    if pending: st.caption(f"{pending} game(s) from last night not final or not loaded yet.")
+    digest = digest.assign(FP=fantasy_points(digest, weights))
+    digest['Fantasy Team'] = digest['ID'].map(rostered).fillna('FA')
+    c_top, c_teams = st.columns([2, 1])
+    with c_top:
+        st.markdown("**Top Performers**")
+        top = digest.nlargest(10, 'FP')[['Player', 'Team', 'Pos', 'G', 'A', 'SOG', 'Svs', 'GA', 'FP', 'Fantasy Team']]
+        st.dataframe(top, hide_index=True, use_container_width=True)
+    with c_teams:
+        st.markdown("**Fantasy Team Totals**")
+        owned = digest[digest['Fantasy Team'] != 'FA']
+        if owned.empty: st.caption("Load a league or roster to see team totals.")
+        else:
+            totals = owned.groupby('Fantasy Team').agg(Players=('ID', 'count'), FP=('FP', 'sum')).reset_index()
+            st.dataframe(totals.sort_values('FP', ascending=False).round(1), hide_index=True, use_container_width=True)
+    st.divider()
+
+# ================= MAIN =================
 with st.spinner('Loading NHL Data...'):
-    df = load_nhl_data()
+    nhl_df = load_nhl_data()
 
-if df.empty:
+if nhl_df.empty:
     st.warning("No data found. API might be down.")
 else:
     with st.sidebar:
         st.header("⚙️ League Settings")
         st.caption("Enter your ESPN League ID (must be public)")
-        league_id = st.text_input("ESPN League ID", key="league_id_input", placeholder="e.g., 234472")
+        league_input = st.text_input("ESPN League ID(s)", key="league_id_input", placeholder="e.g., 234472, 981234")
+        league_ids = list(dict.fromkeys(l.strip() for l in league_input.split(',') if l.strip()))
+        # All leagues load concurrently and share one NHL player index; the selected one drives the app
+        league_results = fetch_espn_leagues(league_ids, 2026) if league_ids else {}
+        league_id = None
+        if len(league_ids) > 1:
+            league_id = st.selectbox("Active League", league_ids, key="active_league",
+                                     format_func=lambda l: f"{league_results[l][2]} ({l})" if league_results[l][3] == 'SUCCESS' else l)
+        elif league_ids:
+            league_id = league_ids[0]
         status_container = st.empty()
+
+        league_type = st.radio("Scoring Type", ["Points", "Categories"], key="league_type", horizontal=True)
+        if league_type == "Categories":
+            with st.expander("Categories", expanded=False):
+                categories = st.multiselect("Scored Categories", SKATER_CATEGORIES + GOALIE_CATEGORIES,
+                                            default=SKATER_CATEGORIES + GOALIE_CATEGORIES, key="categories")
+                skater_pool = st.number_input("Skater Pool Size", min_value=50, max_value=800, value=300, step=10)
+                goalie_pool = st.number_input("Goalie Pool Size", min_value=10, max_value=120, value=60, step=5)
         
         with st.expander("Fantasy Scoring (FP)", expanded=False):
-            val_G = st.number_input("Goals", value=2.0)
-            val_A = st.number_input("Assists", value=1.0)
-            val_PPP = st.number_input("PPP", value=0.5)
-            val_SHP = st.number_input("SHP", value=0.5)
-            val_SOG = st.number_input("SOG", value=0.1)
-            val_Hit = st.number_input("Hits", value=0.1)
-            val_BkS = st.number_input("Blocks", value=0.5)
-            val_W = st.number_input("Wins", value=4.0)
-            val_GA = st.number_input("GA", value=-2.0)
-            val_Svs = st.number_input("Saves", value=0.2)
-            val_SO = st.number_input("Shutouts", value=3.0)
-            val_OTL = st.number_input("OTL", value=1.0)
-
-    if 'initial_df' not in st.session_state: st.session_state.initial_df = df.copy()
+            weights = {
+                'G': st.number_input("Goals", value=2.0),
+                'A': st.number_input("Assists", value=1.0),
+                'PPP': st.number_input("PPP", value=0.5),
+                'SHP': st.number_input("SHP", value=0.5),
+                'SOG': st.number_input("SOG", value=0.1),
+                'Hits': st.number_input("Hits", value=0.1),
+                'BkS': st.number_input("Blocks", value=0.5),
+                'W': st.number_input("Wins", value=4.0),
+                'GA': st.number_input("GA", value=-2.0),
+                'Svs': st.number_input("Saves", value=0.2),
+                'SO': st.number_input("Shutouts", value=3.0),
+                'OTL': st.number_input("OTL", value=1.0),
+            }
 
+    owners = None
     if league_id:
         try:
-            roster_data, standings_df, league_name, status = fetch_espn_league_data(league_id, 2026)
+            roster_data, standings_df, league_name, status = league_results[league_id]
             if status == 'SUCCESS':
                 status_container.success(f"✅ Loaded: {league_name}")
                 st.session_state.league_name = league_name 
                 st.session_state.league_rosters = roster_data 
-                roster_players = [p['Name'] for team in roster_data.values() for p in team]
-                st.session_state.my_roster = [p for p in st.session_state.my_roster if p in roster_players]
-                player_team_map = {p['Name']: p.get('NHLTeam', 'FA') for team in roster_data.values() for p in team}
-                df['Team'] = df['Player'].apply(lambda x: player_team_map.get(x, x) if x in roster_players else 'FA')
+                owners = {p['Name']: p.get('NHLTeam', 'FA') for team in roster_data.values() for p in team}
+                st.session_state.my_roster = [p for p in st.session_state.my_roster if p in owners]
                 if not standings_df.empty: st.session_state.espn_standings = standings_df
             elif status == 'PRIVATE':
                 status_container.error("🚫 League is Private or Invalid ID.")
-                df = st.session_state.initial_df.copy()
             elif status == 'FAILED_FETCH':
                 status_container.error("⚠️ Error fetching data. Check ID.")
-                df = st.session_state.initial_df.copy()
         except Exception as e:
-            df = st.session_state.initial_df.copy()
-
-    df['FP'] = ((df['G'] * val_G) + (df['A'] * val_A) + (df['PPP'] * val_PPP) + 
-                (df['SHP'] * val_SHP) + (df['SOG'] * val_SOG) + (df['Hits'] * val_Hit) + 
-                (df['BkS'] * val_BkS) + (df['W'] * val_W) + (df['GA'] * val_GA) + 
-                (df['Svs'] * val_Svs) + (df['SO'] * val_SO) + (df['OTL'] * val_OTL)).round(1)
-
-    df['GamesRemaining'] = 82 - df['GP']
-    def calc_ros(col): return (df[col] / df['GP']).fillna(0) * df['GamesRemaining']
-    for s in ['G', 'A', 'Pts', 'PPP', 'SHP', 'SOG', 'Hits', 'BkS', 'FP', 'W', 'Svs', 'SO']:
-        if s in df.columns: df[f'ROS_{s}'] = calc_ros(s)
-
-    # --- TABS ---
-    tab_label_5 = f"🏆 {st.session_state.league_name}"
-    tab_home, tab_analytics, tab_tools, tab_fantasy, tab_league, tab_standings, tab_gamecenter, tab_scoreboard = st.tabs([
-        "🏠 Home", "📊 Data & Analytics", "🛠️ Fantasy Tools", 
-        "⚔️ My Fantasy Team", tab_label_5, "📊 League Standings", "🥅 Game Center", "📅 Scoreboard"
-    ])
-
-    # ================= TAB 1: HOME =================
-    with tab_home:
-        # Load 3 days of schedule
-        games_yesterday, games_today, games_tomorrow = load_schedule()
-        
-        # News
-        news = load_nhl_news()
-        if news:
-            with st.container(border=True):
-                cols = st.columns(4)
-                for i, article in enumerate(news[:4]):
-                    with cols[i]:
-                        img_html = f'<img src="{article["image"]}" class="news-img-v">' if article['image'] else ''
-                        st.markdown(f"""
-                        <div class="news-card-v">
-                            {img_html}
-                            <div class="news-content-v">
-                                <a href="{article['link']}" target="_blank" class="news-title-v">{article['headline']}</a>
-                                <div class="news-desc-v">{article['description']}</div>
-                            </div>
-                        </div>""", unsafe_allow_html=True)
-        st.divider()
-
-        # TICKER (LIVE / TODAY)
-        st.subheader("Live & Recent Games")
-        
-        ticker_games = []
-        if games_today: ticker_games.extend(games_today)
-        if games_yesterday: ticker_games.extend(games_yesterday)
-        
-        # Sort Ticker: Live -> Final -> Future
-        def sort_key(g):
-            if g.get('is_live'): return 0
-            if 'Final' in g.get('time', ''): return 1
-            return 2
-        ticker_games.sort(key=sort_key)
-        
-        if ticker_games:
-            # Render Ticker Grid
-            cols = st.columns(min(len(ticker_games), 8)) # Up to 8 columns
-            for i, game in enumerate(ticker_games[:8]): # Show top 8 relevant games
-                with cols[i]:
-                    status_color = "status-live" if game.get("is_live") else ""
-                    st.markdown(f"""
-                    <div class="ticker-card">
-                        <div class="ticker-team-row">
-                            <img src="{game['away_logo']}" class="ticker-logo">
-                            <span>{game['away']}</span>
-                            <span class="ticker-score">{game.get('away_score', '')}</span>
-                        </div>
-                        <div class="ticker-team-row">
-                            <img src="{game['home_logo']}" class="ticker-logo">
-                            <span>{game['home']}</span>
-                            <span class="ticker-score">{game.get('home_score', '')}</span>
-                        </div>
-                        <div class="ticker-status {status_color}">{game['time']}</div>
-                    </div>""", unsafe_allow_html=True)
-                    
-                    if st.button("Stats", key=f"tick_{game['id']}"):
-                        set_game_id(game['id'])
-                        st.switch_page("app.py") # Triggers rerun to update session state
-        else:
-            st.info("No active or recent games to display.")
-        
-        if st.button("📅 View Full Scoreboard"):
-             # Just a visual cue, user clicks the tab
-             st.info("Click the '📅 Scoreboard' tab above to see all games.")
-
-        st.divider()
-        col_sos, col_news = st.columns([3, 2])
-        with col_sos:
-            st.header("💪 Strength of Schedule")
-            with st.spinner("Calculating..."):
-                sos_matrix, standings = get_weekly_schedule_matrix()
-            if not sos_matrix.empty and standings:
-                def get_logo(abbr): return f"https://assets.nhle.com/logos/nhl/svg/{abbr}_light.svg"
-                sos_display = sos_matrix.copy()
-                sos_display.index = sos_display.index.map(get_logo)
-                sos_display.reset_index(inplace=True)
-                sos_display.rename(columns={'index': 'Team'}, inplace=True) 
-                day_cols = [c for c in sos_display.columns if c != 'Team']
-                for col in day_cols:
-                    def transform_cell(val):
-                        if not val or val == "": return None
-                        parts = val.split(" ")
-                        if len(parts) > 1: return get_logo(parts[1])
-                        return None
-                    sos_display[col] = sos_display[col].apply(transform_cell)
-                column_config = {"Team": st.column_config.ImageColumn("Team", width="small")}
-                for col in day_cols: column_config[col] = st.column_config.ImageColumn(col, width="small")
-                st.dataframe(sos_display, use_container_width=True, height=500, column_config=column_config, hide_index=True)
-
-        with col_news:
-            st.header("🔥 Hot This Week")
-            df_weekly = load_weekly_leaders()
-            if not df_weekly.empty:
-                def make_mini_chart(data, x_col, y_col, color, title):
-                    sorted_data = data.sort_values(y_col, ascending=False).head(5)
-                    chart = alt.Chart(sorted_data).mark_bar(cornerRadiusEnd=4).encode(x=alt.X(f'{y_col}:Q', title=None), y=alt.Y(f'{x_col}:N', sort='-x', title=None), color=alt.value(color), tooltip=[x_col, y_col]).properties(title=title, height=200)
-                    text = chart.mark_text(align='left', dx=2).encode(text=f'{y_col}:Q')
-                    return (chart + text)
-                st.altair_chart(make_mini_chart(df_weekly, 'Player', 'G', '#ff4b4b', 'Top Goal Scorers'), use_container_width=True)
-                st.altair_chart(make_mini_chart(df_weekly, 'Player', 'Pts', '#0083b8', 'Top Points Leaders'), use_container_width=True)
-
-    # ================= TAB 2-6 (Standard) =================
-    with tab_analytics:
-        st.header("📈 Breakout Detector")
-        skater_options = df[df['PosType'] == 'Skater'].sort_values('Pts', ascending=False)
-        selected_player_name = st.selectbox("Select Player:", skater_options['Player'].unique())
-        if selected_player_name:
-            pid = dict(zip(skater_options['Player'], skater_options['ID']))[selected_player_name]
-            game_log = get_player_game_log(pid)
-            if not game_log.empty:
-                game_log['Rolling Points'] = game_log['points'].rolling(window=5, min_periods=1).mean()
-                chart_data = game_log[['gameDate', 'points', 'Rolling Points']].set_index('gameDate')
-                st.line_chart(chart_data, color=["#d3d3d3", "#ff4b4b"])
-        st.divider()
-        st.subheader("League Summary")
-        st.dataframe(df, use_container_width=True, hide_index=True, height=600)
-
-    with tab_tools:
-        st.header("⚖️ Trade Analyzer")
-        if 'espn_standings' in st.session_state and not st.session_state.espn_standings.empty:
-            st.subheader("🏆 League Standings")
-            st.dataframe(st.session_state.espn_standings, use_container_width=True, hide_index=True)
-        # (Trade Logic omitted for brevity, same as before)
-
-    with tab_fantasy:
-        st.header("⚔️ My Roster")
-        col_up, _ = st.columns([1, 2])
-        with col_up: uploaded_file = st.file_uploader("📂 Load Saved Roster (CSV)", type=["csv"])
-        time_filter = st.selectbox("Select Time Frame", ["Season (2025/26)", "Last 7 Days", "Last 15 Days", "Last 30 Days"])
-        if uploaded_file:
-            try:
-                udf = pd.read_csv(uploaded_file)
-                if "Player" in udf.columns: st.session_state.my_roster = [p for p in udf["Player"] if p in df['Player'].values]
-            except: pass
-        selected_players = st.multiselect("Search Players:", df['Player'].unique(), default=st.session_state.my_roster)
-        st.session_state.my_roster = selected_players
-        if selected_players:
-            base_team_df = df[df['Player'].isin(selected_players)].copy()
-            display_df = base_team_df 
-            if time_filter != "Season (2025/26)":
-                days_map = {"Last 7 Days": 7, "Last 15 Days": 15, "Last 30 Days": 30}
-                days = days_map.get(time_filter, 0)
-                start_date = pd.Timestamp.now().normalize() - pd.Timedelta(days=days)
-                with st.spinner(f"Fetching stats..."):
-                    recent_stats = []
-                    for _, row in base_team_df.iterrows():
-                        pid = row['ID']
-                        logs = get_player_game_log(pid) 
-                        if not logs.empty:
-                            mask = logs['gameDate'] >= start_date
-                            recent = logs[mask]
-                            stat_dict = {
-                                'ID': pid, 'Player': row['Player'], 'Team': row['Team'], 'Pos': row['Pos'], 'GP': len(recent),
-                                'G': recent['goals'].sum() if 'goals' in recent else 0, 'A': recent['assists'].sum() if 'assists' in recent else 0,
-                                'Pts': recent['points'].sum() if 'points' in recent else 0, 'SOG': recent['shots'].sum() if 'shots' in recent else 0,
-                                'PPP': recent['powerPlayPoints'].sum() if 'powerPlayPoints' in recent else 0, 'Hits': recent['hits'].sum() if 'hits' in recent else 0,
-                                'BkS': recent['blockedShots'].sum() if 'blockedShots' in recent else 0, 'PIM': recent['pim'].sum() if 'pim' in recent else 0,
-                                'W': len(recent[recent['decision'] == 'W']) if 'decision' in recent else 0, 'SO': recent['shutouts'].sum() if 'shutouts' in recent else 0,
-                                'Svs': recent['saves'].sum() if 'saves' in recent else 0, 'GA': recent['goalsAgainst'].sum() if 'goalsAgainst' in recent else 0,
-                                'L': len(recent[recent['decision'] == 'L']) if 'decision' in recent else 0, 'OTL': len(recent[recent['decision'] == 'OT']) if 'decision' in recent else 0,
-                                'SHP': recent['shorthandedPoints'].sum() if 'shorthandedPoints' in recent else 0
-                            }
-                            fp = (stat_dict['G']*val_G + stat_dict['A']*val_A + stat_dict['PPP']*val_PPP + stat_dict['SOG']*val_SOG + stat_dict['Hits']*val_Hit + stat_dict['BkS']*val_BkS + stat_dict['W']*val_W + stat_dict['GA']*val_GA + stat_dict['Svs']*val_Svs + stat_dict['SO']*val_SO + (stat_dict['SHP'] * val_SHP))
-                            stat_dict['FP'] = fp
-                            recent_stats.append(stat_dict)
-                    if recent_stats:
-                        display_df = pd.DataFrame(recent_stats)
-                        if 'TOI' in df.columns: display_df = display_df.merge(df[['ID', 'TOI']], on='ID', how='left')
-            if not display_df.empty:
-                st.dataframe(display_df, use_container_width=True, hide_index=True)
-    
-    with tab_league:
-        st.header(f"Rosters for {st.session_state.league_name}")
-        if st.session_state.get('league_rosters'):
-            roster_dict = st.session_state.league_rosters
-            team_names = list(roster_dict.keys())
-            cols = st.columns(4)
-            for i, team_name in enumerate(team_names):
-                roster = roster_dict[team_name]
-                team_df = pd.DataFrame(roster)
-                with cols[i % 4]:
-                    st.subheader(team_name)
-                    st.dataframe(team_df[['Name', 'NHLTeam']], use_container_width=True, hide_index=True)
-        else: st.info("Enter League ID.")
-
-    with tab_standings:
-        st.header("🏒 NHL Standings")
-        view_type = st.radio("Select View", ('League (Overall)', 'Conference', 'Division'), horizontal=True)
-        standings_data = fetch_nhl_standings(view_type.split(' ')[0])
-        if not standings_data.empty:
-            standings_data['Team Icon'] = standings_data.apply(lambda row: f"<img src='{row['Icon']}' width='30'> {row['Team']}", axis=1)
-            st.markdown(standings_data[['Rank', 'Team Icon', 'GP', 'W', 'L', 'OTL', 'PTS']].to_html(escape=False, index=False), unsafe_allow_html=True)
-
-    # ================= TAB 7: GAME CENTER =================
-    with tab_gamecenter:
-        if st.session_state.selected_game_id:
-            g_id = st.session_state.selected_game_id
-            st.header("🥅 Game Center")
-            box_data = fetch_nhl_boxscore(g_id)
-            if box_data:
-                home = box_data.get('homeTeam', {})
-                away = box_data.get('awayTeam', {})
-                c1, c2, c3 = st.columns([1, 0.2, 1])
-                with c1: st.markdown(f"<div style='text-align:center'><img src='{away.get('logo', '')}' width='80'><h2>{away.get('name', {}).get('default', 'Away')}</h2><h3>{away.get('score', 0)}</h3></div>", unsafe_allow_html=True)
-                with c2: st.markdown("<h2 style='text-align:center; padding-top:40px'>VS</h2>", unsafe_allow_html=True)
-                with c3: st.markdown(f"<div style='text-align:center'><img src='{home.get('logo', '')}' width='80'><h2>{home.get('name', {}).get('default', 'Home')}</h2><h3>{home.get('score', 0)}</h3></div>", unsafe_allow_html=True)
-                st.divider()
-                st.subheader("Box Score")
-                def parse_stats(team_data):
-                    rows = []
-                    # Logic handles both 'landing' and 'boxscore' structures
-                    stats_source = box_data.get('playerByGameStats', {}).get('awayTeam' if team_data == away else 'homeTeam', {})
-                    if not stats_source and 'boxscore' in box_data:
-                        stats_source = box_data['boxscore'].get('playerByGameStats', {}).get('awayTeam' if team_data == away else 'homeTeam', {})
-
-                    players = stats_source.get('forwards', []) + stats_source.get('defense', [])
-                    for p in players:
-                        rows.append({"Player": p.get('name', {}).get('default'), "G": p.get('goals', 0), "A": p.get('assists', 0), "Pts": p.get('points', 0), "SOG": p.get('shots', 0), "TOI": p.get('toi', '00:00')})
-                    return pd.DataFrame(rows) if rows else pd.DataFrame(columns=["Player", "G", "A", "Pts", "SOG", "TOI"])
-
-                c_away, c_home = st.columns(2)
-                with c_away: st.dataframe(parse_stats(away), hide_index=True, use_container_width=True)
-                with c_home: st.dataframe(parse_stats(home), hide_index=True, use_container_width=True)
-            else: st.error("Could not load box score.")
-        else: st.info("👈 Select a game.")
-
-    # ================= TAB 8: FULL SCOREBOARD =================
-    with tab_scoreboard:
-        st.header("📅 Full Scoreboard")
-        # Reuse loader to show full grid
-        c_yest, c_today, c_tom = st.columns(3)
-        def render_simple(game):
-            st.markdown(f"**{game['away']} {game['away_score']}** @ **{game['home']} {game['home_score']}** ({game['time']})")
-            if st.button("Stats", key=f"sb_btn_{game['id']}"):
-                set_game_id(game['id'])
-                st.rerun()
-
-        with c_yest:
-            st.subheader("Yesterday")
-            for g in games_yesterday: render_simple(g)
-        with c_today:
-            st.subheader("Today")
-            for g in games_today: render_simple(g)
-        with c_tom:
-            st.subheader("Tomorrow")
-            for g in games_tomorrow: render_simple(g)
+            owners = None
+
+    # Ownership mapping, FP and ROS are cached per (weights, owners)
+    df = build_player_table(weights, owners)
+    value_col = 'ROS_FP'
+    if league_type == "Categories" and categories:
+        # Z-score value table is shared across sessions; only new categories/pool sizes are computed
+        values = category_values(categories, int(skater_pool), int(goalie_pool))
+        df = df.merge(values[['ID', 'Value', 'Value%']], on='ID', how='left')
+        value_col = 'Value'
+
+    # NHL player ID -> fantasy team, for live scoring
+    rostered = {}
+    for team_name, roster in st.session_state.league_rosters.items():
+        for p in roster:
+            if roster_id(p): rostered[roster_id(p)] = team_name
+    league_owned = set(rostered) if owners else set()  # waiver index syncs on league rosters only
+    if not rostered:
+        for pid in df.loc[df['Player'].isin(st.session_state.my_roster), 'ID']: rostered[int(pid)] = "My Team"
+
+    # The league page is labelled with the loaded league's name. Its value stays PAGE_LEAGUE, but the browser
+    # sends back the label, so re-select it when the name changes or the next rerun would fall back to Home.
+    league_label = f"🏆 {st.session_state.league_name}"
+    if st.session_state.get('nav') == PAGE_LEAGUE and st.session_state.get('nav_league_label', league_label) != league_label:
+        st.session_state.nav = PAGE_LEAGUE
+    st.session_state.nav_league_label = league_label
+    page = st.radio("Page", PAGES, key="nav", horizontal=True, label_visibility="collapsed",
+                    format_func=lambda p: league_label if p == PAGE_LEAGUE else p)
+
+    if page == PAGE_HOME: render_home(home_data)
+    elif page == PAGE_ANALYTICS: render_analytics(df)
+    elif page == PAGE_TOOLS:
+        render_tools(df, value_col)
+        render_waivers(league_id, weights, league_owned, df)
+    elif page == PAGE_FANTASY: render_fantasy(df, weights)
+    elif page == PAGE_LEAGUE: render_league(df, value_col)
+    elif page == PAGE_STANDINGS: render_standings()
+    elif page == PAGE_GAMECENTER: render_gamecenter(weights, rostered)
+    elif page == PAGE_SCOREBOARD: render_scoreboard(load_schedule(), weights, rostered)
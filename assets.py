@@ -0,0 +1,139 @@
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+import requests
+
+from data_loader import TEAM_LOGO_URL
+
+# --- LOCAL ASSET CACHE ---
+# Team logos and news images are fetched once and served by us instead of by
+# assets.nhle.com / ESPN on every view. Files are written to ./static/assets and
+# served by Streamlit with `server.enableStaticServing`; the `?v=` query changes when
+# a file is re-downloaded, and serve.py marks those URLs immutable, so the browser
+# fetches each logo once no matter how many cells show it.
+# Lookups never block a render: an uncached URL is returned as-is while the
+# download runs in the background, and the next render picks up the local copy.
+# Files nobody has asked for in ASSET_MAX_IDLE (news images that left the feed) are
+# deleted, along with their resolved URLs, by a sweep that runs at most hourly.
+
+# SLAPSHOT_ASSET_DIR moves the cache out of ./static (load tests); files there aren't served
+STATIC_DIR = Path(os.environ.get("SLAPSHOT_ASSET_DIR", Path(__file__).parent / "static" / "assets"))
+STATIC_URL = "app/static/assets"
+ASSET_MAX_IDLE = 3 * 86400
+PRUNE_INTERVAL = 3600
+
+_resolved = {}  # remote url -> (url to emit, file stem)
+_used = {}  # file stem -> last time a lookup returned it
+_pending = set()
+_pruned_at = 0
+_lock = threading.Lock()
+_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="slapshot-assets")
+
+STATIC_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def _stem(url):
+    return hashlib.sha1(url.encode()).hexdigest()[:16]
+
+
+def _on_disk(url):
+    # Skip in-progress downloads (*.tmp), which disappear once they're renamed into place
+    return next((p for p in STATIC_DIR.glob(f"{_stem(url)}.*") if p.suffix != ".tmp"), None)
+
+
+def _minify_svg(raw):
+    text = raw.decode("utf-8", errors="ignore")
+    if text.startswith("<?xml"): text = text[text.find("?>") + 2:]
+    return " ".join(text.split()).encode()
+
+
+def _from_file(url, path):
+    return f"{STATIC_URL}/{path.name}?v={int(path.stat().st_mtime)}"
+
+
+def _fetch(url):
+    try:
+        r = requests.get(url, timeout=5)
+        r.raise_for_status()
+        suffix = Path(urlparse(url).path).suffix.lower()
+        if not suffix:
+            content_type = r.headers.get("Content-Type", "").split(";")[0].strip()
+            suffix = mimetypes.guess_extension(content_type) or ".bin"
+        path = STATIC_DIR / f"{_stem(url)}{suffix}"
+        tmp = path.with_suffix(f"{path.suffix}.{os.getpid()}.tmp")  # the pipeline may write alongside the app
+        tmp.write_bytes(_minify_svg(r.content) if suffix == ".svg" else r.content)
+        tmp.replace(path)
+        resolved = _from_file(url, path)
+    except Exception:
+        resolved = None  # leave it unresolved so a later render retries
+
+    with _lock:
+        _pending.discard(url)
+        if resolved:
+            _resolved[url] = (resolved, _stem(url))
+            _used[_stem(url)] = time.time()
+    if time.time() - _pruned_at > PRUNE_INTERVAL: prune()
+    return resolved or url
+
+
+def local_asset(url, wait=False):
+    """Return the local static URL for `url`, or `url` itself until it's cached."""
+    if not url or url.startswith(("data:", STATIC_URL)): return url
+
+    with _lock:
+        hit = _resolved.get(url)
+        if hit:
+            _used[hit[1]] = time.time()
+            return hit[0]
+
+    path = _on_disk(url)
+    if path is not None:
+        resolved = _from_file(url, path)
+        with _lock:
+            _resolved[url] = (resolved, _stem(url))
+            _used[_stem(url)] = time.time()
+        return resolved
+
+    if wait: return _fetch(url)
+    with _lock:
+        if url in _pending: return url
+        _pending.add(url)
+    _pool.submit(_fetch, url)
+    return url
+
+
+def prune(max_idle=ASSET_MAX_IDLE):
+    """Delete files not written or looked up in `max_idle` seconds and forget their URLs; returns the count."""
+    global _pruned_at
+    now = _pruned_at = time.time()
+    with _lock:
+        used = dict(_used)
+    removed = set()
+    for path in STATIC_DIR.iterdir():
+        stem = path.name.split(".")[0]
+        try: mtime = path.stat().st_mtime
+        except OSError: continue
+        last = mtime if path.suffix == ".tmp" else max(mtime, used.get(stem, 0))  # a .tmp this old was abandoned
+        if last < now - max_idle:
+            path.unlink(missing_ok=True)
+            if path.suffix != ".tmp": removed.add(stem)
+    with _lock:
+        for url in [u for u, (_, stem) in _resolved.items() if stem in removed]: del _resolved[url]
+        for stem in removed: _used.pop(stem, None)
+    return len(removed)
+
+
+def team_logo(abbr):
+    return local_asset(TEAM_LOGO_URL.format(abbr=abbr))
+
+
+def warm(urls):
+    """Fetch every URL concurrently and wait; returns how many are now served locally."""
+    results = list(_pool.map(lambda u: local_asset(u, wait=True), [u for u in urls if u]))
+    return sum(1 for r in results if r.startswith(STATIC_URL))
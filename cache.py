@@ -0,0 +1,305 @@
+import contextlib
+import copy
+import functools
+import hashlib
+import os
+import pickle
+import sys
+import threading
+import time
+from pathlib import Path
+
+# --- PLUGGABLE CACHE FOR THE DATA LAYER ---
+# data_loader.py decorates its loaders with `cache_data` from here instead of
+# `st.cache_data`, so the fetch/transform code runs without the Streamlit runtime.
+# The backend is picked on first use:
+#   * SLAPSHOT_CACHE_DIR set     -> DiskBackend (shared with `python pipeline.py`)
+#   * streamlit already imported -> StreamlitBackend (plain st.cache_data)
+#   * otherwise                  -> MemoryBackend
+# or forced with set_backend().
+# `cache_resource` is the st.cache_resource counterpart for shared, uncopied objects.
+#
+# Like st.cache_data, a miss is computed once per key: concurrent callers wait for the
+# first one and then read its result. Each entry's expiry is fixed when it's written,
+# expired entries are deleted, and past `max_entries` the ones closest to expiry go
+# first, so per-user keys don't pile up.
+
+CACHE_DIR_ENV = "SLAPSHOT_CACHE_DIR"
+MAX_ENTRIES = 2000
+PRUNE_INTERVAL = 60  # seconds between sweeps for expired entries
+FOREVER = 10 * 365 * 86400  # expiry used for ttl=None
+
+_MISS = object()
+
+
+def _expiry(ttl):
+    return time.time() + (FOREVER if ttl is None else ttl)
+
+
+class _KeyLocks:
+    """One lock per key, held while that key is computed; dropped once nobody waits on it."""
+
+    def __init__(self):
+        self._locks = {}  # key -> [lock, holders + waiters]
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def hold(self, key):
+        with self._lock:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]: yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]: del self._locks[key]
+
+
+class MemoryBackend:
+    """In-process TTL cache. Values are copied on the way out so callers can mutate them."""
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._store = {}  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._pruned_at = time.time()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._store.get(key)
+            if entry is not None and entry[0] < time.time():
+                del self._store[key]
+                entry = None
+        if entry is None: return _MISS
+        return copy.deepcopy(entry[1])
+
+    def set(self, key, value, ttl):
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._store[key] = (_expiry(ttl), value)
+            now = time.time()
+            if len(self._store) > self.max_entries or now - self._pruned_at > PRUNE_INTERVAL:
+                self._pruned_at = now
+                expired = [k for k, (expires, _) in self._store.items() if expires < now]
+                for k in expired: del self._store[k]
+                excess = len(self._store) - self.max_entries
+                if excess > 0:
+                    for k in sorted(self._store, key=lambda k: self._store[k][0])[:excess]: del self._store[k]
+
+    def clear(self, prefix=""):
+        with self._lock:
+            for key in [k for k in self._store if k.startswith(prefix)]:
+                del self._store[key]
+
+
+class DiskBackend:
+    """Pickle-per-entry cache in a directory. Each file's mtime is set to its expiry time.
+
+    Written by the headless pipeline and read by the web app, so user requests can be
+    served from precomputed results. Loaded entries are kept in memory until the file
+    on disk changes. Expiry and the entry cap only need a stat per file, so any process
+    sharing the directory can sweep it.
+    """
+
+    def __init__(self, directory, max_entries=MAX_ENTRIES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self._loaded = {}
+        self._lock = threading.Lock()
+        self._pruned_at = 0
+
+    def _path(self, key):
+        return self.directory / f"{key}.pkl"
+
+    def get(self, key):
+        path = self._path(key)
+        try: expires = path.stat().st_mtime
+        except OSError: expires = 0
+        if expires < time.time():
+            with self._lock:
+                self._loaded.pop(key, None)
+            return _MISS
+
+        with self._lock:
+            loaded = self._loaded.get(key)
+        if loaded is None or loaded[0] != expires:
+            try:
+                with open(path, "rb") as f: value = pickle.load(f)
+            except Exception:
+                return _MISS
+            loaded = (expires, value)
+            with self._lock:
+                self._loaded[key] = loaded
+        return copy.deepcopy(loaded[1])
+
+    def set(self, key, value, ttl):
+        path = self._path(key)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f: pickle.dump(value, f)
+        expires = _expiry(ttl)
+        os.utime(tmp, (expires, expires))
+        os.replace(tmp, path)  # atomic, readers never see a half-written file
+        if time.time() - self._pruned_at > PRUNE_INTERVAL: self.prune()
+
+    def prune(self):
+        """Delete expired entries, then the ones closest to expiry beyond `max_entries`."""
+        now = self._pruned_at = time.time()
+        live = []
+        for path in self.directory.glob("*.pkl"):
+            try: expires = path.stat().st_mtime
+            except OSError: continue
+            if expires < now: path.unlink(missing_ok=True)
+            else: live.append((expires, path))
+        live.sort()
+        for _, path in live[:max(len(live) - self.max_entries, 0)]:
+            path.unlink(missing_ok=True)
+        kept = {path.stem for _, path in live[-self.max_entries:]} if self.max_entries else set()
+        with self._lock:
+            for key in [k for k in self._loaded if k not in kept]: del self._loaded[key]
+
+    def clear(self, prefix=""):
+        for path in self.directory.glob(f"{prefix}*.pkl"):
+            path.unlink(missing_ok=True)
+        with self._lock:
+            self._loaded.clear()
+
+
+class StreamlitBackend:
+    """Delegates to st.cache_data; only used when the app is running under Streamlit."""
+
+
+_backend = None
+
+
+def set_backend(backend):
+    global _backend
+    _backend = backend
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if os.environ.get(CACHE_DIR_ENV):
+            _backend = DiskBackend(os.environ[CACHE_DIR_ENV])
+        elif "streamlit" in sys.modules:
+            _backend = StreamlitBackend()
+        else:
+            _backend = MemoryBackend()
+    return _backend
+
+
+def _make_key(func, args, kwargs):
+    try:
+        raw = pickle.dumps((args, sorted(kwargs.items())))
+    except Exception:
+        raw = repr((args, sorted(kwargs.items()))).encode()
+    return f"{func.__name__}-{hashlib.sha1(raw).hexdigest()[:16]}"
+
+
+class _CachedFunction:
+    def __init__(self, func, ttl):
+        functools.update_wrapper(self, func)
+        self._func = func
+        self._ttl = ttl
+        self._st_func = None
+        self._key_locks = _KeyLocks()
+
+    def _streamlit_func(self):
+        if self._st_func is None:
+            import streamlit as st
+            # Loaders also run on data_loader's worker pools, which have no session to draw a spinner in
+            self._st_func = st.cache_data(ttl=self._ttl, show_spinner=False)(self._func)
+        return self._st_func
+
+    def __call__(self, *args, **kwargs):
+        backend = get_backend()
+        if isinstance(backend, StreamlitBackend):
+            return self._streamlit_func()(*args, **kwargs)
+
+        key = _make_key(self._func, args, kwargs)
+        value = backend.get(key)
+        if value is not _MISS: return value
+        with self._key_locks.hold(key):
+            # Another caller may have computed it while we waited
+            value = backend.get(key)
+            if value is _MISS:
+                value = self._func(*args, **kwargs)
+                backend.set(key, value, self._ttl)
+        return value
+
+    def store(self, value, *args, ttl=None, **kwargs):
+        """Write `value` as the cached result for these arguments (used by the pipeline).
+
+        `ttl` is how long readers serve it before fetching themselves; the loader's own TTL by default.
+        """
+        backend = get_backend()
+        if isinstance(backend, StreamlitBackend):
+            raise RuntimeError("store() is not supported with the Streamlit backend")
+        backend.set(_make_key(self._func, args, kwargs), value, self._ttl if ttl is None else ttl)
+
+    def clear(self):
+        backend = get_backend()
+        if isinstance(backend, StreamlitBackend):
+            self._streamlit_func().clear()
+        else:
+            backend.clear(prefix=f"{self._func.__name__}-")
+
+
+def cache_data(ttl=None):
+    """Drop-in replacement for `st.cache_data(ttl=...)` that works without Streamlit."""
+    def decorator(func):
+        return _CachedFunction(func, ttl)
+    return decorator
+
+
+class _CachedResource:
+    def __init__(self, func, ttl):
+        functools.update_wrapper(self, func)
+        self._func = func
+        self._ttl = ttl
+        self._st_func = None
+        self._store = {}
+        self._lock = threading.Lock()
+        self._key_locks = _KeyLocks()
+
+    def __call__(self, *args, **kwargs):
+        if isinstance(get_backend(), StreamlitBackend):
+            if self._st_func is None:
+                import streamlit as st
+                self._st_func = st.cache_resource(ttl=self._ttl)(self._func)
+            return self._st_func(*args, **kwargs)
+
+        key = _make_key(self._func, args, kwargs)
+        value = self._fresh(key)
+        if value is not _MISS: return value
+        with self._key_locks.hold(key):
+            value = self._fresh(key)
+            if value is _MISS:
+                value = self._func(*args, **kwargs)
+                with self._lock:
+                    self._store[key] = (time.time(), value)
+        return value
+
+    def _fresh(self, key):
+        with self._lock:
+            entry = self._store.get(key)
+        if entry is not None and (self._ttl is None or time.time() - entry[0] <= self._ttl):
+            return entry[1]
+        return _MISS
+
+    def clear(self):
+        if self._st_func is not None: self._st_func.clear()
+        with self._lock:
+            self._store.clear()
+
+
+def cache_resource(ttl=None):
+    """Drop-in replacement for `st.cache_resource`: one shared, uncopied object per arguments.
+
+    Never goes to disk; use it for in-process state such as indexes and engines.
+    """
+    def decorator(func):
+        return _CachedResource(func, ttl)
+    return decorator
@@ -1,13 +1,43 @@
 import requests
 import pandas as pd
-import streamlit as st
 from datetime import datetime, timedelta
 import pytz
 import difflib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from cache import cache_data
+
+# --- UPSTREAM ENDPOINTS ---
+# Overridable so the app can be pointed at a local stand-in (see loadtest.py)
+NHL_STATS_API = os.environ.get("NHL_STATS_API", "https://api.nhle.com/stats/rest/en")
+NHL_WEB_API = os.environ.get("NHL_WEB_API", "https://api-web.nhle.com/v1")
+NHL_ASSETS = os.environ.get("NHL_ASSETS", "https://assets.nhle.com")
+ESPN_SITE_API = os.environ.get("ESPN_SITE_API", "http://site.api.espn.com/apis/site/v2/sports/hockey/nhl")
+ESPN_FANTASY_API = os.environ.get("ESPN_FANTASY_API", "https://fantasy.espn.com/apis/v3/games/fhl")
+TEAM_LOGO_URL = NHL_ASSETS + "/logos/nhl/svg/{abbr}_light.svg"
+
+# --- BACKGROUND WORK ---
+# Loader-level tasks (prefetch) and raw HTTP calls get separate pools: loader tasks may
+# wait on request futures, request tasks never wait on anything, so neither can starve.
+_prefetch_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="slapshot-prefetch")
+_request_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="slapshot-request")
+
+def submit(func, *args, **kwargs):
+    """Run a loader on the prefetch pool and return its Future."""
+    return _prefetch_pool.submit(func, *args, **kwargs)
+
+def submit_request(func, *args, **kwargs):
+    """Run a leaf HTTP task on the request pool. It must not wait on other futures."""
+    return _request_pool.submit(func, *args, **kwargs)
+
+def prefetch(loaders):
+    """Start every loader in {name: callable} at once and return {name: Future}."""
+    return {name: submit(func) for name, func in loaders.items()}
 
 # --- GENERIC FETCHER ---
 def fetch_data(endpoint, report_type, sort_key, override_cayenne=None, aggregate=False):
-    url = f"https://api.nhle.com/stats/rest/en/{endpoint}/{report_type}"
+    url = f"{NHL_STATS_API}/{endpoint}/{report_type}"
     
     if override_cayenne:
         cayenne_exp = override_cayenne
@@ -31,7 +61,7 @@ def fetch_data(endpoint, report_type, sort_key, override_cayenne=None, aggregate
         return pd.DataFrame()
 
 # --- MAIN DATA LOADER (CACHED) ---
-@st.cache_data(ttl=3600)
+@cache_data(ttl=3600)
 def load_nhl_data():
     # 1. Skaters
     df_sum = fetch_data("skater", "summary", "points")
@@ -104,9 +134,38 @@ def load_nhl_data():
     
     return df_combined[final_cols]
 
-@st.cache_data(ttl=600)
+# --- FANTASY SCORING ---
+ROS_STATS = ['G', 'A', 'Pts', 'PPP', 'SHP', 'SOG', 'Hits', 'BkS', 'FP', 'W', 'Svs', 'SO']
+
+def fantasy_points(frame, weights):
+    """Weighted sum of stat columns, e.g. weights={'G': 2.0, 'A': 1.0, ...}."""
+    total = pd.Series(0.0, index=frame.index)
+    for stat, weight in weights.items():
+        if stat in frame.columns: total += pd.to_numeric(frame[stat], errors='coerce').fillna(0) * weight
+    return total.round(1)
+
+@cache_data(ttl=600)
+def build_player_table(weights, owners=None):
+    """Season table with FP and rest-of-season projections.
+
+    `owners` maps rostered player names to their NHL team for a loaded ESPN league;
+    everyone else is marked 'FA'. Cached per (weights, owners), so only a scoring or
+    roster change recomputes it.
+    """
+    df = load_nhl_data()
+    if df.empty: return df
+    if owners is not None:
+        df['Team'] = df['Player'].apply(lambda x: owners.get(x, x) if x in owners else 'FA')
+
+    df['FP'] = fantasy_points(df, weights)
+    df['GamesRemaining'] = 82 - df['GP']
+    for s in ROS_STATS:
+        if s in df.columns: df[f'ROS_{s}'] = (df[s] / df['GP']).fillna(0) * df['GamesRemaining']
+    return df
+
+@cache_data(ttl=600)
 def get_player_game_log(player_id):
-    url = f"https://api-web.nhle.com/v1/player/{player_id}/game-log/20252026/2"
+    url = f"{NHL_WEB_API}/player/{player_id}/game-log/20252026/2"
     try:
         response = requests.get(url, timeout=5)
         response.raise_for_status()
@@ -119,7 +178,9 @@ def get_player_game_log(player_id):
     except: return pd.DataFrame()
 
 # --- LOAD SCHEDULE ---
-@st.cache_data(ttl=60)
+FINAL_STATES = ('OFF', 'FINAL')
+
+@cache_data(ttl=60)
 def load_schedule():
     est_tz = pytz.timezone('US/Eastern')
     now_est = datetime.now(pytz.utc).astimezone(est_tz)
@@ -130,7 +191,7 @@ def load_schedule():
     yesterday_str = (now_est - timedelta(days=1)).strftime("%Y-%m-%d")
 
     # Requesting yesterday gives the rolling window
-    url = f"https://api-web.nhle.com/v1/schedule/{yesterday_str}"
+    url = f"{NHL_WEB_API}/schedule/{yesterday_str}"
     
     try:
         response = requests.get(url, timeout=5)
@@ -191,7 +252,7 @@ def load_schedule():
         return games_yesterday, games_today, games_tomorrow
     except: return [], [], []
 
-@st.cache_data(ttl=3600)
+@cache_data(ttl=3600)
 def load_weekly_leaders():
     end_date = datetime.now()
     start_date = end_date - timedelta(days=7)
@@ -202,13 +263,47 @@ def load_weekly_leaders():
     df = df.rename(columns=rename_map)
     return df
 
-@st.cache_data(ttl=3600)
+@cache_data(ttl=3600)
+def load_recent_stats(days):
+    """Per-player totals over the last `days` days (skaters and goalies), in load_nhl_data's column names."""
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days)
+    date_filter = f"gameTypeId=2 and gameDate >= '{start_date.strftime('%Y-%m-%d')}' and gameDate <= '{end_date.strftime('%Y-%m-%d')}'"
+    # Three independent aggregate reports; run them side by side
+    futures = [submit_request(fetch_data, "skater", "summary", "points", override_cayenne=date_filter, aggregate=True),
+               submit_request(fetch_data, "skater", "realtime", "hits", override_cayenne=date_filter, aggregate=True),
+               submit_request(fetch_data, "goalie", "summary", "wins", override_cayenne=date_filter, aggregate=True)]
+    df_sum, df_real, df_goalies = (f.result() for f in futures)
+
+    frames = []
+    if not df_sum.empty:
+        df_sum = df_sum.rename(columns={'playerId': 'ID', 'gamesPlayed': 'GP', 'goals': 'G', 'assists': 'A', 'points': 'Pts',
+                                        'ppPoints': 'PPP', 'shPoints': 'SHP', 'shots': 'SOG', 'penaltyMinutes': 'PIM'})
+        if not df_real.empty:
+            df_real = df_real[['playerId', 'hits', 'blockedShots']].rename(columns={'playerId': 'ID', 'hits': 'Hits', 'blockedShots': 'BkS'})
+            df_sum = df_sum.merge(df_real, on='ID', how='left')
+        frames.append(df_sum)
+    if not df_goalies.empty:
+        frames.append(df_goalies.rename(columns={'playerId': 'ID', 'gamesPlayed': 'GP', 'wins': 'W', 'losses': 'L', 'otLosses': 'OTL',
+                                                 'shutouts': 'SO', 'saves': 'Svs', 'goalsAgainst': 'GA', 'shotsAgainst': 'SA'}))
+    if not frames: return pd.DataFrame()
+
+    df = pd.concat(frames, ignore_index=True)
+    stat_cols = ['GP', 'G', 'A', 'Pts', 'PPP', 'SHP', 'SOG', 'PIM', 'Hits', 'BkS', 'W', 'L', 'OTL', 'SO', 'Svs', 'GA', 'SA']
+    for col in stat_cols:
+        if col not in df.columns: df[col] = 0
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    return df[['ID'] + stat_cols]
+
+@cache_data(ttl=3600)
 def get_weekly_schedule_matrix():
     return _get_weekly_schedule_matrix_impl()
 
 def _get_weekly_schedule_matrix_impl():
-    url_sched = "https://api-web.nhle.com/v1/schedule/now"
-    url_stand = "https://api-web.nhle.com/v1/standings/now"
+    url_sched = f"{NHL_WEB_API}/schedule/now"
+    url_stand = f"{NHL_WEB_API}/standings/now"
+    # Both requests are independent, so fetch standings while the schedule is in flight
+    stand_future = _request_pool.submit(requests.get, url_stand, timeout=5)
     try:
         resp_sched = requests.get(url_sched, timeout=5)
         data_sched = resp_sched.json()
@@ -239,7 +334,7 @@ def _get_weekly_schedule_matrix_impl():
                 matrix.at[home, day_name] = f"vs {away}"
                 matrix.at[away, day_name] = f"@ {home}"
 
-        resp_stand = requests.get(url_stand, timeout=5)
+        resp_stand = stand_future.result()
         data_stand = resp_stand.json()
         standings = {}
         for team in data_stand.get('standings', []):
@@ -250,9 +345,9 @@ def _get_weekly_schedule_matrix_impl():
     except:
         return pd.DataFrame(), {}
 
-@st.cache_data(ttl=3600)
+@cache_data(ttl=3600)
 def load_nhl_news():
-    url = "http://site.api.espn.com/apis/site/v2/sports/hockey/nhl/news"
+    url = f"{ESPN_SITE_API}/news"
     try:
         response = requests.get(url, timeout=5)
         data = response.json()
@@ -274,9 +369,9 @@ def load_nhl_news():
         return []
 
 # --- FETCH NHL STANDINGS ---
-@st.cache_data(ttl=300)
+@cache_data(ttl=300)
 def fetch_nhl_standings(view_type):
-    url = "https://api-web.nhle.com/v1/standings/now"
+    url = f"{NHL_WEB_API}/standings/now"
     
     try:
         response = requests.get(url, timeout=5)
@@ -306,13 +401,17 @@ def fetch_nhl_standings(view_type):
                 'Group': group,
                 'Team': team_name,
                 'Abbrev': team_abbr,
-                'Icon': f"https://assets.nhle.com/logos/nhl/svg/{team_abbr}_light.svg",
+                'Icon': TEAM_LOGO_URL.format(abbr=team_abbr),
                 'GP': team_entry.get('gamesPlayed', 0),
                 'W': team_entry.get('wins', 0),
                 'L': team_entry.get('losses', 0),
                 'OTL': team_entry.get('otLosses', 0),
                 'PTS': team_entry.get('points', 0),
                 'P%': team_entry.get('pointPctg', 0),
+                'RW': team_entry.get('regulationWins', 0),
+                'ROW': team_entry.get('regulationPlusOtWins', 0),
+                'Conference': conf,
+                'Division': div,
                 'Rank': rank
             })
 
@@ -324,53 +423,141 @@ def fetch_nhl_standings(view_type):
     except Exception as e:
         return pd.DataFrame()
 
-# --- UNIFIED ESPN LEAGUE FETCHER ---
-@st.cache_data(ttl=60)
-def fetch_espn_league_data(league_id, season_year):
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'application/json',
-    }
-    params = {'view': 'mRoster,mSettings,mTeam'}
-
-    def try_fetch(year):
-        url = f"https://fantasy.espn.com/apis/v3/games/fhl/seasons/{year}/segments/0/leagues/{league_id}"
-        try:
-            r = requests.get(url, params=params, headers=headers, timeout=5)
-            if r.status_code == 200: return r.json(), 'SUCCESS'
-            if r.status_code == 401: return {}, 'PRIVATE'
-            return {}, 'ERROR'
-        except:
-            return {}, 'ERROR'
-
-    data, status = try_fetch(season_year)
-    if status == 'ERROR':
-        data, status = try_fetch(season_year - 1)
-
-    if status != 'SUCCESS':
-        return {}, pd.DataFrame(), "League Rosters", status
-
-    league_name = data.get('settings', {}).get('name', 'League Rosters')
+# --- REMAINING SCHEDULE ---
+@cache_data(ttl=43200)
+def load_remaining_schedule():
+    """Every regular-season game from today to the end of the season: id, date, home, away, state.
 
+    Raises if any week can't be fetched, so a partial schedule is never cached.
+    """
+    today = datetime.now(pytz.utc).astimezone(pytz.timezone('US/Eastern')).date()
+    def week(start):
+        r = requests.get(f"{NHL_WEB_API}/schedule/{start}", timeout=10)
+        r.raise_for_status()
+        return r.json()
+
+    first = week(today.isoformat())
+    weeks = [first]
+    end = first.get('regularSeasonEndDate')
+    if end:
+        # The season end is known up front, so the remaining weeks can be fetched side by side
+        end = datetime.strptime(end, "%Y-%m-%d").date()
+        starts = [today + timedelta(days=d) for d in range(7, (end - today).days + 1, 7)]
+        weeks += [future.result() for future in [submit_request(week, d.isoformat()) for d in starts]]
+    else:
+        # No season bounds in the payload; follow nextStartDate one week at a time
+        data = first
+        while data.get('nextStartDate') and len(weeks) < 40:
+            data = week(data['nextStartDate'])
+            weeks.append(data)
+
+    rows = {}
+    for data in weeks:
+        for day in data.get('gameWeek', []):
+            for g in day.get('games', []):
+                if g.get('gameType', 2) != 2: continue
+                rows[g['id']] = {'id': g['id'], 'date': day['date'], 'home': g['homeTeam']['abbrev'],
+                                 'away': g['awayTeam']['abbrev'], 'game_state': g.get('gameState', 'FUT')}
+    df = pd.DataFrame(rows.values(), columns=['id', 'date', 'home', 'away', 'game_state'])
+    return df[df['date'] >= today.isoformat()].reset_index(drop=True)
+
+_last_remaining_schedule = None
+
+@cache_data(ttl=300)
+def load_remaining_schedule_or_last():
+    """load_remaining_schedule, or after a failed crawl the last full one this process loaded (None if none).
+
+    Cached for a few minutes either way, so a failing upstream is retried every few
+    minutes instead of on every render.
+    """
+    global _last_remaining_schedule
+    try: _last_remaining_schedule = load_remaining_schedule()
+    except:
+        if _last_remaining_schedule is None: return None
+        today = datetime.now(pytz.utc).astimezone(pytz.timezone('US/Eastern')).date().isoformat()
+        return _last_remaining_schedule[_last_remaining_schedule['date'] >= today].reset_index(drop=True)
+    return _last_remaining_schedule
+
+# --- ESPN LEAGUE FETCHER (MULTI-LEAGUE) ---
+ESPN_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'application/json',
+}
+
+@cache_data(ttl=60)
+def fetch_espn_league_raw(league_id, season_year):
+    url = f"{ESPN_FANTASY_API}/seasons/{season_year}/segments/0/leagues/{league_id}"
     try:
-        nhl_df = load_nhl_data() 
-        nhl_player_names = nhl_df['Player'].tolist()
-        nhl_metadata = {row['Player']: {'ID': row['ID'], 'Team': row['Team']} for _, row in nhl_df[['Player', 'ID', 'Team']].dropna(subset=['Player']).iterrows()}
+        r = requests.get(url, params={'view': 'mRoster,mSettings,mTeam'}, headers=ESPN_HEADERS, timeout=5)
+        if r.status_code == 200: return r.json(), 'SUCCESS'
+        if r.status_code == 401: return {}, 'PRIVATE'
+        if r.status_code == 404: return {}, 'NOT_FOUND'
+        return {}, 'ERROR'
     except:
-        nhl_player_names = []
-        nhl_metadata = {}
-    
-    def find_metadata(roster_name):
+        return {}, 'ERROR'
+
+def _fetch_league_payload(league_id, season_year):
+    data, status = fetch_espn_league_raw(league_id, season_year)
+    # Only fall back a season when this one doesn't exist yet; timeouts/5xx won't be fixed by asking again
+    if status == 'NOT_FOUND':
+        data, status = fetch_espn_league_raw(league_id, season_year - 1)
+    return data, status
+
+class PlayerIndex:
+    """NHL name -> {'ID', 'Team'} lookup shared by every league, with memoized fuzzy matches."""
+
+    def __init__(self, nhl_df):
+        rows = nhl_df[['Player', 'ID', 'Team']].dropna(subset=['Player'])
+        self.names = rows['Player'].tolist()
+        self.metadata = {p: {'ID': i, 'Team': t} for p, i, t in zip(rows['Player'], rows['ID'], rows['Team'])}
+        self._matches = {}
+        self.built = datetime.now()
+
+    def find(self, roster_name):
         rn = str(roster_name).strip()
-        if rn in nhl_metadata: return nhl_metadata[rn]
-        candidate = difflib.get_close_matches(rn, nhl_player_names, n=1, cutoff=0.6)
-        if candidate and candidate[0] in nhl_metadata:
-            return nhl_metadata[candidate[0]]
-        return None
+        if rn in self.metadata: return self.metadata[rn]
+        if rn not in self._matches:
+            candidate = difflib.get_close_matches(rn, self.names, n=1, cutoff=0.6)
+            self._matches[rn] = self.metadata.get(candidate[0]) if candidate else None
+        return self._matches[rn]
+
+_player_index = None
+_league_entries = {}  # league_id -> {ESPN player id: (fullName, roster entry)} from the previous payload
+_league_lock = threading.Lock()
+_index_build_lock = threading.Lock()
+
+def get_player_index():
+    global _player_index
+    with _league_lock:
+        current = _player_index
+    if current is not None and datetime.now() - current.built <= timedelta(hours=1): return current
+
+    # Build outside _league_lock (load_nhl_data can be several slow stats calls). One thread
+    # rebuilds; while it does, others keep using the stale index if there is one.
+    if not _index_build_lock.acquire(blocking=current is None):
+        return current
+    try:
+        with _league_lock:
+            current = _player_index
+        if current is not None and datetime.now() - current.built <= timedelta(hours=1): return current
+        try: fresh = PlayerIndex(load_nhl_data())
+        except: fresh = PlayerIndex(pd.DataFrame(columns=['Player', 'ID', 'Team']))
+        with _league_lock:
+            _player_index = fresh
+        return fresh
+    finally:
+        _index_build_lock.release()
+
+def _resolve_rosters(league_id, data, index):
+    # Diff against the previous payload: unchanged (id, name) entries keep their resolved metadata
+    with _league_lock:
+        previous = _league_entries.get(league_id, {})
+        if previous.get('_index') is not index: previous = {}
+    current = {'_index': index}
 
     roster_data = {}
+    teams_map = {}
     try:
-        teams_map = {}
         for t in data.get('teams', []):
             t_id = t['id']
             name = t.get('name')
@@ -385,22 +572,31 @@ def fetch_espn_league_data(league_id, season_year):
         for team in data.get('teams', []):
             team_name = teams_map.get(team['id'], "Unknown")
             roster_data[team_name] = []
-            entries = team.get('roster', {}).get('entries', [])
-            
-            for slot in entries:
+            for slot in team.get('roster', {}).get('entries', []):
                 player_data = slot.get('playerPoolEntry', {}).get('player', {})
                 full_name = player_data.get('fullName')
-                if full_name:
-                    meta = find_metadata(full_name)
+                if not full_name: continue
+                espn_id = player_data.get('id', full_name)
+                cached = previous.get(espn_id)
+                if cached and cached[0] == full_name:
+                    roster_entry = cached[1]
+                else:
+                    meta = index.find(full_name)
                     roster_entry = {
                         'Name': full_name,
                         'ID': str(meta['ID']).strip() if meta else '0',
                         'NHLTeam': str(meta['Team']).strip() if meta else 'N/A'
                     }
-                    roster_data[team_name].append(roster_entry)
+                current[espn_id] = (full_name, roster_entry)
+                roster_data[team_name].append(dict(roster_entry))
     except:
         roster_data = {}
 
+    with _league_lock:
+        _league_entries[league_id] = current
+    return roster_data, teams_map
+
+def _league_standings(data, teams_map):
     standings_list = []
     try:
         for team in data.get('teams', []):
@@ -417,18 +613,41 @@ def fetch_espn_league_data(league_id, season_year):
             df_standings = df_standings.sort_values(by='Rank', ascending=True)
     except:
         df_standings = pd.DataFrame()
+    return df_standings
 
-    return roster_data, df_standings, league_name, 'SUCCESS'
+def fetch_espn_leagues(league_ids, season_year):
+    """
+    Loads several ESPN leagues at once. Payloads are fetched concurrently, then every
+    league resolves its rosters against one shared NHL player index.
+    Returns {league_id: (roster_data, standings_df, league_name, status)}.
+    """
+    league_ids = list(dict.fromkeys(str(l).strip() for l in league_ids if str(l).strip()))
+    futures = {l: submit_request(_fetch_league_payload, l, season_year) for l in league_ids}
+    index = get_player_index()
+
+    results = {}
+    for league_id, future in futures.items():
+        data, status = future.result()
+        if status != 'SUCCESS':
+            results[league_id] = ({}, pd.DataFrame(), "League Rosters", 'PRIVATE' if status == 'PRIVATE' else 'FAILED_FETCH')
+            continue
+        league_name = data.get('settings', {}).get('name', 'League Rosters')
+        roster_data, teams_map = _resolve_rosters(league_id, data, index)
+        results[league_id] = (roster_data, _league_standings(data, teams_map), league_name, 'SUCCESS')
+    return results
+
+def fetch_espn_league_data(league_id, season_year):
+    return fetch_espn_leagues([league_id], season_year)[str(league_id).strip()]
 
 # --- NEW: FETCH BOX SCORE ---
-@st.cache_data(ttl=60)
+@cache_data(ttl=60)
 def fetch_nhl_boxscore(game_id):
     """
     Fetches game data. Tries the 'boxscore' endpoint first for stats,
     then falls back to 'landing' for pre-game info.
     """
     # 1. Try Boxscore (Best for stats)
-    url_box = f"https://api-web.nhle.com/v1/gamecenter/{game_id}/boxscore"
+    url_box = f"{NHL_WEB_API}/gamecenter/{game_id}/boxscore"
     try:
         r = requests.get(url_box, timeout=5)
         if r.status_code == 200:
@@ -436,7 +655,7 @@ def fetch_nhl_boxscore(game_id):
     except: pass
     
     # 2. Try Landing (Best for pre-game / summary)
-    url_land = f"https://api-web.nhle.com/v1/gamecenter/{game_id}/landing"
+    url_land = f"{NHL_WEB_API}/gamecenter/{game_id}/landing"
     try:
         r = requests.get(url_land, timeout=5)
         if r.status_code == 200:
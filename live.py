@@ -0,0 +1,311 @@
+import threading
+import time
+from collections import Counter, defaultdict
+
+import pandas as pd
+import requests
+
+from cache import cache_data
+from data_loader import FINAL_STATES, NHL_WEB_API, fantasy_points, fetch_nhl_boxscore, load_schedule, submit, submit_request
+
+# --- LIVE PLAY-BY-PLAY TRACKER ---
+# One process-wide tracker shared by every session. Each refresh downloads a game's
+# play-by-play feed at most once per `min_interval`, then applies only the events
+# past the last processed sortOrder to per-player running counters. Parsing work is
+# proportional to new events, not to game length. The feed itself has no delta
+# endpoint, so the download is still the full document.
+# Reviews can rewrite plays already applied (an overturned goal, a changed assist).
+# Each refresh re-checks only the positions where goals were applied, plus the play
+# count, and replays the game from scratch when they differ.
+
+PBP_URL = NHL_WEB_API + "/gamecenter/{game_id}/play-by-play"
+STAT_COLS = ['G', 'A', 'PPP', 'SHP', 'SOG', 'Hits', 'BkS', 'PIM', 'SA', 'Svs', 'GA', 'W', 'L', 'OTL', 'SO']
+
+
+def fetch_play_by_play(game_id):
+    try:
+        r = requests.get(PBP_URL.format(game_id=game_id), timeout=5)
+        r.raise_for_status()
+        return r.json()
+    except:
+        return {}
+
+
+def _goal_key(play):
+    d = play.get('details', {})
+    return (d.get('scoringPlayerId'), d.get('assist1PlayerId'), d.get('assist2PlayerId'),
+            d.get('goalieInNetId'), d.get('eventOwnerTeamId'), play.get('situationCode'))
+
+
+def _strengths(situation_code):
+    # situationCode is "<away goalie><away skaters><home skaters><home goalie>", e.g. "1451".
+    # Skaters + goalie keeps a pulled goalie (6 skaters, 0 goalie) from reading as a power play.
+    if not situation_code or len(situation_code) != 4 or not situation_code.isdigit(): return None, None
+    away = int(situation_code[0]) + int(situation_code[1])
+    home = int(situation_code[2]) + int(situation_code[3])
+    return away, home
+
+
+class _GameState:
+    def __init__(self, game_id):
+        self.game_id = game_id
+        self.last_sort = -1
+        self.last_fetch = 0.0
+        self.game_state = 'FUT'
+        self.home_id = None
+        self.away_id = None
+        self.finalized = False
+        self.counters = defaultdict(Counter)
+        self.applied = 0   # plays applied so far
+        self.goals = []    # (index in plays, eventId, _goal_key) of each goal as applied
+        self.players = {}  # playerId -> {'Player', 'Team', 'Pos'}
+        self.team_of = {}  # playerId -> NHL team id
+
+    def ingest(self, feed):
+        if not feed: return 0
+        self.game_state = feed.get('gameState', self.game_state)
+        if self.home_id is None:
+            self.home_id = feed.get('homeTeam', {}).get('id')
+            self.away_id = feed.get('awayTeam', {}).get('id')
+        if not self.players:  # rosterSpots can be empty until warmups
+            abbrevs = {self.home_id: feed.get('homeTeam', {}).get('abbrev'), self.away_id: feed.get('awayTeam', {}).get('abbrev')}
+            for spot in feed.get('rosterSpots', []):
+                name = f"{spot.get('firstName', {}).get('default', '')} {spot.get('lastName', {}).get('default', '')}".strip()
+                self.players[spot['playerId']] = {'Player': name, 'Team': abbrevs.get(spot.get('teamId'), 'N/A'), 'Pos': spot.get('positionCode', '')}
+                self.team_of[spot['playerId']] = spot.get('teamId')
+
+        # Plays are ordered by sortOrder; walk back from the end to find only the new ones
+        plays = feed.get('plays', [])
+        start = len(plays)
+        while start > 0 and plays[start - 1].get('sortOrder', 0) > self.last_sort:
+            start -= 1
+        if start != self.applied or not all(self._same_goal(plays[i], event_id, key) for i, event_id, key in self.goals):
+            self._reset()
+            start = 0
+        for i in range(start, len(plays)):
+            self._apply(plays[i])
+            if plays[i].get('typeDescKey') == 'goal': self.goals.append((i, plays[i].get('eventId'), _goal_key(plays[i])))
+        self.applied = len(plays)
+        if start < len(plays): self.last_sort = plays[-1].get('sortOrder', self.last_sort)
+
+        if self.game_state in FINAL_STATES and not self.finalized:
+            self._finalize(feed)
+        return len(plays) - start
+
+    @staticmethod
+    def _same_goal(play, event_id, key):
+        return play.get('typeDescKey') == 'goal' and play.get('eventId') == event_id and _goal_key(play) == key
+
+    def _reset(self):
+        self.counters.clear()
+        self.goals = []
+        self.applied = 0
+        self.last_sort = -1
+
+    def _apply(self, play):
+        if play.get('periodDescriptor', {}).get('periodType') == 'SO': return  # shootouts don't count
+        kind = play.get('typeDescKey')
+        d = play.get('details', {})
+        c = self.counters
+
+        if kind == 'goal':
+            scorers = [d.get('scoringPlayerId'), d.get('assist1PlayerId'), d.get('assist2PlayerId')]
+            if scorers[0]: c[scorers[0]]['G'] += 1; c[scorers[0]]['SOG'] += 1
+            for pid in scorers[1:]:
+                if pid: c[pid]['A'] += 1
+            away, home = _strengths(play.get('situationCode'))
+            if away is not None:
+                own, opp = (home, away) if d.get('eventOwnerTeamId') == self.home_id else (away, home)
+                stat = 'PPP' if own > opp else 'SHP' if own < opp else None
+                if stat:
+                    for pid in scorers:
+                        if pid: c[pid][stat] += 1
+            if d.get('goalieInNetId'): c[d['goalieInNetId']]['GA'] += 1; c[d['goalieInNetId']]['SA'] += 1
+        elif kind == 'shot-on-goal':
+            if d.get('shootingPlayerId'): c[d['shootingPlayerId']]['SOG'] += 1
+            if d.get('goalieInNetId'): c[d['goalieInNetId']]['Svs'] += 1; c[d['goalieInNetId']]['SA'] += 1
+        elif kind == 'hit':
+            if d.get('hittingPlayerId'): c[d['hittingPlayerId']]['Hits'] += 1
+        elif kind == 'blocked-shot':
+            if d.get('blockingPlayerId'): c[d['blockingPlayerId']]['BkS'] += 1
+        elif kind == 'penalty':
+            if d.get('committedByPlayerId'): c[d['committedByPlayerId']]['PIM'] += d.get('duration', 0)
+
+    def _finalize(self, feed):
+        # Decisions aren't in the feed; credit the goalie who faced the most shots on each side
+        home_score = feed.get('homeTeam', {}).get('score', 0)
+        away_score = feed.get('awayTeam', {}).get('score', 0)
+        last_period = feed.get('gameOutcome', {}).get('lastPeriodType', 'REG')
+        for team_id, won, conceded in ((self.home_id, home_score > away_score, away_score),
+                                       (self.away_id, away_score > home_score, home_score)):
+            goalies = [pid for pid, p in self.players.items() if p['Pos'] == 'G' and self.team_of.get(pid) == team_id]
+            faced = [pid for pid in goalies if self.counters[pid]['SA'] > 0]
+            if not faced: continue
+            starter = max(faced, key=lambda pid: self.counters[pid]['SA'])
+            if won: self.counters[starter]['W'] += 1
+            elif last_period in ('OT', 'SO'): self.counters[starter]['OTL'] += 1
+            else: self.counters[starter]['L'] += 1
+            if conceded == 0 and len(faced) == 1 and last_period != 'SO': self.counters[starter]['SO'] += 1
+        self.finalized = True
+
+    def frame(self):
+        rows = []
+        for pid, info in self.players.items():
+            row = {'ID': pid, 'GameID': self.game_id, **info}
+            row.update({s: self.counters[pid].get(s, 0) for s in STAT_COLS})
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+
+class LiveGameTracker:
+    def __init__(self, min_interval=20):
+        self.min_interval = min_interval
+        self._games = {}
+        self._lock = threading.Lock()
+
+    def refresh(self, game_ids):
+        """Pull new events for `game_ids` plus any tracked game that hasn't gone final yet."""
+        now = time.time()
+        with self._lock:
+            for g_id in game_ids:
+                if g_id not in self._games: self._games[g_id] = _GameState(g_id)
+            due = [g for g in self._games.values()
+                   if not g.finalized and now - g.last_fetch >= self.min_interval]
+            for g in due: g.last_fetch = now  # claim it so concurrent sessions don't refetch
+
+        futures = [(g, submit_request(fetch_play_by_play, g.game_id)) for g in due]
+        new_events = 0
+        for g, future in futures:
+            feed = future.result()
+            with self._lock:
+                new_events += g.ingest(feed)
+        self._prune(now)
+        return new_events
+
+    def _prune(self, now, keep_for=86400):
+        with self._lock:
+            for g_id in [g_id for g_id, g in self._games.items() if now - g.last_fetch > keep_for]:
+                del self._games[g_id]
+
+    def player_stats(self, game_ids=None):
+        with self._lock:
+            games = [g for g_id, g in self._games.items() if game_ids is None or g_id in game_ids]
+            frames = [g.frame() for g in games]
+        frames = [f for f in frames if not f.empty]
+        if not frames: return pd.DataFrame(columns=['ID', 'GameID', 'Player', 'Team', 'Pos'] + STAT_COLS)
+        return pd.concat(frames, ignore_index=True)
+
+    def live_points(self, weights, rostered, game_ids=None):
+        """Live FP for rostered players. `rostered` maps NHL player ID -> fantasy team name."""
+        stats = self.player_stats(game_ids)
+        stats = stats[stats['ID'].isin(list(rostered))].copy()
+        stats.insert(1, 'Fantasy Team', stats['ID'].map(rostered))
+        stats['FP'] = fantasy_points(stats, weights)
+        return stats.sort_values('FP', ascending=False)
+
+
+tracker = LiveGameTracker()
+
+
+# --- LAST NIGHT DIGEST ---
+# Every final game from yesterday's slate, flattened into one player table. Each game's
+# rows are cached on their own for the day, so a late West Coast final only fetches
+# that one game; the finished table for a set of finals is cached for the day too.
+# While some games fail to load, the partial table is cached for a minute instead, so
+# the missing games are retried about once a minute, not on every rerun. Stats are
+# raw; FP is applied per user.
+# Box scores carry goals, assists and shots but only power-play/shorthanded *goals*,
+# so PPP and SHP come from replaying the game's play-by-play through _GameState.
+DIGEST_STATS = ['G', 'A', 'Pts', 'PPP', 'SHP', 'SOG', 'Hits', 'BkS', 'PIM', 'SA', 'Svs', 'GA', 'W', 'L', 'OTL', 'SO']
+
+
+def _flatten_boxscore(box, special, game_id, cols):
+    """Append the game's player rows to `cols`; False if the payload has no player stats.
+
+    `special` maps playerId -> counters with PPP/SHP from the play-by-play.
+    """
+    stats = box.get('playerByGameStats') or box.get('boxscore', {}).get('playerByGameStats', {})
+    if not stats: return False
+    for side in ('awayTeam', 'homeTeam'):
+        team = stats.get(side, {})
+        abbrev = box.get(side, {}).get('abbrev', 'N/A')
+        for group in ('forwards', 'defense', 'goalies'):
+            for p in team.get(group, []):
+                pid = p.get('playerId', 0)
+                row = dict.fromkeys(DIGEST_STATS, 0)
+                if group == 'goalies':
+                    saves, shots = p.get('saves'), p.get('shotsAgainst')
+                    if saves is None or shots is None:  # older payloads only carry "saves/shots"
+                        try: saves, shots = (int(x) for x in p.get('saveShotsAgainst', '0/0').split('/'))
+                        except: saves, shots = 0, 0
+                    decision = p.get('decision', '')
+                    row.update({'SA': shots, 'Svs': saves, 'GA': p.get('goalsAgainst', shots - saves),
+                                'W': int(decision == 'W'), 'L': int(decision == 'L'), 'OTL': int(decision in ('O', 'OT', 'OTL'))})
+                    row['SO'] = int(row['W'] == 1 and row['GA'] == 0)
+                else:
+                    row.update({'G': p.get('goals', 0), 'A': p.get('assists', 0), 'Pts': p.get('points', 0),
+                                'SOG': p.get('sog', p.get('shots', 0)), 'Hits': p.get('hits', 0), 'BkS': p.get('blockedShots', 0)})
+                row['PPP'] = special.get(pid, {}).get('PPP', 0)
+                row['SHP'] = special.get(pid, {}).get('SHP', 0)
+                row['PIM'] = p.get('pim', 0)
+                cols['ID'].append(pid)
+                cols['Player'].append(p.get('name', {}).get('default', 'Unknown'))
+                cols['Team'].append(abbrev)
+                cols['Pos'].append(p.get('position', 'G' if group == 'goalies' else ''))
+                cols['PosType'].append('Goalie' if group == 'goalies' else 'Skater')
+                cols['GameID'].append(game_id)
+                cols['TOI'].append(p.get('toi', '00:00'))
+                for s in DIGEST_STATS: cols[s].append(row[s])
+    return True
+
+
+DIGEST_COLS = ['ID', 'Player', 'Team', 'Pos', 'PosType', 'GameID', 'TOI'] + DIGEST_STATS
+
+
+@cache_data(ttl=86400)
+def _game_digest(game_id):
+    """One final game's player rows; raises if its box score or play-by-play didn't load, so that isn't cached."""
+    box_future, pbp_future = submit_request(fetch_nhl_boxscore, game_id), submit_request(fetch_play_by_play, game_id)
+    feed = pbp_future.result()
+    if 'plays' not in feed: raise RuntimeError(f"play-by-play unavailable for game {game_id}")  # {} means the fetch failed
+    state = _GameState(game_id)
+    state.ingest(feed)
+    cols = {c: [] for c in DIGEST_COLS}
+    if not _flatten_boxscore(box_future.result(), state.counters, game_id, cols):
+        raise RuntimeError(f"box score unavailable for game {game_id}")
+    return pd.DataFrame(cols)
+
+
+@cache_data(ttl=60)
+def _slate_digest(game_ids):
+    """(player table for the games that loaded, ids of the games that didn't)."""
+    futures = [(g_id, submit(_game_digest, g_id)) for g_id in game_ids]
+    frames, failed = [], []
+    for g_id, future in futures:
+        try: frames.append(future.result())
+        except: failed.append(g_id)
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=DIGEST_COLS)
+    for s in DIGEST_STATS: df[s] = pd.to_numeric(df[s], errors='coerce').fillna(0)
+    return df, failed
+
+
+@cache_data(ttl=86400)
+def load_boxscore_digest(game_ids):
+    """One row per player across the given games: ID, Player, Team, Pos, PosType, GameID, TOI + DIGEST_STATS."""
+    df, failed = _slate_digest(game_ids)
+    # Raising keeps a partial slate out of the day-long cache
+    if failed: raise RuntimeError(f"box scores unavailable for games {failed}")
+    return df
+
+
+def last_night_digest():
+    """(digest of yesterday's final games, number of yesterday's games not final or not loaded yet)."""
+    games_yesterday, _, _ = load_schedule()
+    final_ids = tuple(sorted(g['id'] for g in games_yesterday if g.get('game_state') in FINAL_STATES))
+    pending = len(games_yesterday) - len(final_ids)
+    if not final_ids: return pd.DataFrame(), pending
+    try: return load_boxscore_digest(final_ids), pending
+    except RuntimeError:
+        # Same minute-long build load_boxscore_digest just used; the missing games count as pending
+        df, failed = _slate_digest(final_ids)
+        return df, pending + len(failed)
@@ -0,0 +1,414 @@
+"""Concurrent-session load test against a local stand-in for the NHL/ESPN APIs.
+
+Starts a stub HTTP server that serves synthetic but well-formed payloads for every
+upstream endpoint the app uses, launches `streamlit run serve.py` pointed at it, then
+drives N websocket sessions (speaking Streamlit's browser protocol, including
+fragment reruns) through:
+
+    open Home -> enter a league ID -> My Fantasy Team, pick players,
+    switch time frames -> click a ticker game into Game Center
+
+and reports rerun latency percentiles, server RSS, and upstream requests per endpoint.
+An untimed warm-up session runs first; RSS growth is measured from there and averaged
+over the timed sessions. Upstream counts include the warm-up.
+Needs the `websockets` package (a Streamlit dependency on recent releases).
+
+    python loadtest.py --sessions 20
+    python loadtest.py --sessions 50 --latency 0.1 --concurrency 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse
+from urllib.request import urlopen
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+APP_PATH = str(Path(__file__).parent / "serve.py")
+TEAMS = ["ANA", "BOS", "BUF", "CAR", "CBJ", "CGY", "CHI", "COL", "DAL", "DET", "EDM", "FLA", "LAK", "MIN", "MTL", "NJD",
+         "NSH", "NYI", "NYR", "OTT", "PHI", "PIT", "SEA", "SJS", "STL", "TBL", "TOR", "UTA", "VAN", "VGK", "WPG", "WSH"]
+LEAGUE_ID = "424242"
+PAGE_HOME, PAGE_FANTASY = "🏠 Home", "⚔️ My Fantasy Team"  # must match app.py
+TIME_FRAMES = ["Last 7 Days", "Last 15 Days", "Last 30 Days", "Season (2025/26)"]
+
+
+# --- STUB UPSTREAM ---
+class StubData:
+    def __init__(self, seed=7, skaters_per_team=20, goalies_per_team=2):
+        rng = random.Random(seed)
+        self.skaters, self.goalies = [], []
+        pid = 8470000
+        for team in TEAMS:
+            for i in range(skaters_per_team):
+                pid += 1
+                gp = rng.randint(10, 40)
+                g, a = rng.randint(0, gp // 2), rng.randint(0, gp)
+                self.skaters.append({
+                    "playerId": pid, "skaterFullName": f"Skater {team} {i}", "teamAbbrevs": team,
+                    "positionCode": rng.choice("CLRD"), "gamesPlayed": gp, "goals": g, "assists": a, "points": g + a,
+                    "plusMinus": rng.randint(-10, 10), "penaltyMinutes": rng.randint(0, 40), "ppPoints": rng.randint(0, 10),
+                    "shPoints": rng.randint(0, 2), "gameWinningGoals": rng.randint(0, 3), "shots": rng.randint(gp, gp * 4),
+                    "shootingPct": rng.random() * 0.2, "faceoffWinPct": rng.random(), "timeOnIcePerGame": rng.randint(600, 1500),
+                    "hits": rng.randint(0, 80), "blockedShots": rng.randint(0, 60), "satPct": rng.random(), "usatPct": rng.random(),
+                })
+            for i in range(goalies_per_team):
+                pid += 1
+                gp = rng.randint(5, 25)
+                sa = gp * rng.randint(25, 32)
+                ga = int(sa * rng.uniform(0.08, 0.11))
+                w = rng.randint(0, gp)
+                self.goalies.append({
+                    "playerId": pid, "goalieFullName": f"Goalie {team} {i}", "teamAbbrevs": team, "gamesPlayed": gp,
+                    "wins": w, "losses": gp - w, "otLosses": 0, "goalsAgainstAverage": ga / gp, "savePct": 1 - ga / sa,
+                    "shutouts": rng.randint(0, 2), "shotsAgainst": sa, "saves": sa - ga, "goalsAgainst": ga,
+                    "goals": 0, "assists": 0, "points": 0, "penaltyMinutes": 0, "timeOnIcePerGame": 3600,
+                })
+        self.rng = rng
+
+    def games_for(self, date):
+        # Deterministic slate per date; every team plays at most once
+        rng = random.Random(date.toordinal())
+        teams = TEAMS[:]
+        rng.shuffle(teams)
+        today = datetime.now().date()
+        state = "OFF" if date < today else "LIVE" if date == today else "FUT"
+        games = []
+        for i in range(0, rng.randint(4, 8) * 2, 2):
+            home, away = teams[i], teams[i + 1]
+            games.append({
+                "id": 2025020000 + date.toordinal() % 1000 * 10 + i // 2,
+                "startTimeUTC": f"{date.isoformat()}T23:00:00Z", "gameState": state,
+                "homeTeam": {"abbrev": home, "score": rng.randint(0, 5), "logo": f"{{assets}}/logos/nhl/svg/{home}_light.svg"},
+                "awayTeam": {"abbrev": away, "score": rng.randint(0, 5), "logo": f"{{assets}}/logos/nhl/svg/{away}_light.svg"},
+            })
+        return games
+
+    def schedule(self, start):
+        return {"gameWeek": [{"date": (start + timedelta(days=d)).isoformat(), "games": self.games_for(start + timedelta(days=d))}
+                             for d in range(7)]}
+
+    def standings(self):
+        rows = []
+        for i, team in enumerate(TEAMS):
+            gp = 30
+            w = self.rng.randint(10, 20)
+            otl = self.rng.randint(0, 5)
+            rows.append({
+                "teamAbbrev": {"default": team}, "teamName": {"default": f"{team} Team"},
+                "conferenceName": "Eastern" if i % 2 else "Western", "divisionName": ["Atlantic", "Metropolitan", "Central", "Pacific"][i % 4],
+                "conferenceSequence": i // 2 + 1, "divisionSequence": i // 4 + 1, "leagueSequence": i + 1,
+                "gamesPlayed": gp, "wins": w, "losses": gp - w - otl, "otLosses": otl, "points": 2 * w + otl,
+                "pointPctg": (2 * w + otl) / (2 * gp),
+            })
+        return {"standings": rows}
+
+    def game_log(self):
+        today = datetime.now().date()
+        return {"gameLog": [{"gameDate": (today - timedelta(days=2 * d)).isoformat(), "goals": d % 2, "assists": d % 3 == 0,
+                             "points": d % 2 + (d % 3 == 0), "shots": 3, "powerPlayPoints": 0, "hits": 1, "blockedShots": 1,
+                             "pim": 0, "shorthandedPoints": 0} for d in range(30)]}
+
+    def boxscore(self, game_id):
+        skaters = self.skaters[:36]
+        stats = lambda ps: {"forwards": [{"name": {"default": p["skaterFullName"]}, "goals": 1, "assists": 0, "points": 1,
+                                          "shots": 2, "toi": "15:00"} for p in ps], "defense": []}
+        return {"id": game_id, "gameState": "LIVE", "homeTeam": {"name": {"default": "Home"}, "score": 2},
+                "awayTeam": {"name": {"default": "Away"}, "score": 1},
+                "playerByGameStats": {"homeTeam": stats(skaters[:18]), "awayTeam": stats(skaters[18:])}}
+
+    def play_by_play(self, game_id):
+        return {"id": game_id, "gameState": "LIVE", "homeTeam": {"id": 1, "abbrev": "TOR", "score": 1},
+                "awayTeam": {"id": 2, "abbrev": "MTL", "score": 0}, "rosterSpots": [], "plays": []}
+
+    def news(self):
+        return {"articles": [{"headline": f"Headline {i}", "description": "Stub article",
+                              "links": {"web": {"href": "#"}}, "images": []} for i in range(7)]}
+
+    def espn_league(self, league_id):
+        players = self.skaters + self.goalies
+        teams = []
+        for t in range(12):
+            roster = players[t * 16:(t + 1) * 16]
+            teams.append({
+                "id": t + 1, "name": f"Fantasy Team {t + 1}", "playoffSeed": t + 1,
+                "record": {"overall": {"wins": 10 - t % 5, "losses": t % 5, "ties": 0}},
+                "roster": {"entries": [{"playerPoolEntry": {"player": {
+                    "id": p["playerId"], "fullName": p.get("skaterFullName") or p.get("goalieFullName")}}} for p in roster]},
+            })
+        return {"settings": {"name": f"Stub League {league_id}"}, "teams": teams}
+
+
+def endpoint_label(path):
+    # Collapse ids/dates so counts group by endpoint rather than by URL
+    path = re.sub(r"/\d{4}-\d{2}-\d{2}", "/{date}", path)
+    path = re.sub(r"/\d+", "/{id}", path)
+    return re.sub(r"/[A-Z]{3}_light\.svg$", "/{team}_light.svg", path)
+
+
+def make_server(data, latency):
+    counts = Counter()
+    counts_lock = threading.Lock()
+    svg = b'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 10 10"><circle cx="5" cy="5" r="4"/></svg>'
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args): pass
+
+        def do_GET(self):
+            path = urlparse(self.path).path
+            with counts_lock:
+                counts[endpoint_label(path)] += 1
+            if latency: time.sleep(latency)
+
+            today = datetime.now().date()
+            body, ctype = None, "application/json"
+            if path.startswith("/stats/rest/en/skater/"): body = {"data": data.skaters}
+            elif path.startswith("/stats/rest/en/goalie/"): body = {"data": data.goalies}
+            elif path == "/v1/schedule/now": body = data.schedule(today)
+            elif m := re.fullmatch(r"/v1/schedule/(\d{4}-\d{2}-\d{2})", path):
+                body = data.schedule(datetime.strptime(m.group(1), "%Y-%m-%d").date())
+            elif path == "/v1/standings/now": body = data.standings()
+            elif re.fullmatch(r"/v1/player/\d+/game-log/.*", path): body = data.game_log()
+            elif m := re.fullmatch(r"/v1/gamecenter/(\d+)/(boxscore|landing)", path): body = data.boxscore(int(m.group(1)))
+            elif m := re.fullmatch(r"/v1/gamecenter/(\d+)/play-by-play", path): body = data.play_by_play(int(m.group(1)))
+            elif path.endswith("/news"): body = data.news()
+            elif m := re.fullmatch(r"/espn/seasons/\d+/segments/0/leagues/(\d+)", path): body = data.espn_league(m.group(1))
+            elif path.endswith(".svg"): body, ctype = svg, "image/svg+xml"
+
+            if body is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            raw = body if isinstance(body, bytes) else json.dumps(body).replace("{assets}", self.server.base_url).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.base_url = f"http://127.0.0.1:{server.server_port}"
+    return server, counts
+
+
+def upstream_env(base_url):
+    return {
+        "NHL_STATS_API": f"{base_url}/stats/rest/en",
+        "NHL_WEB_API": f"{base_url}/v1",
+        "NHL_ASSETS": base_url,
+        "ESPN_SITE_API": f"{base_url}/apis/site/v2/sports/hockey/nhl",
+        "ESPN_FANTASY_API": f"{base_url}/espn",
+        "SLAPSHOT_ASSET_DIR": tempfile.mkdtemp(prefix="slapshot-assets-"),
+    }
+
+
+# --- APP SERVER ---
+def start_app(port, env):
+    cmd = [sys.executable, "-m", "streamlit", "run", APP_PATH, "--server.port", str(port), "--server.headless", "true",
+           "--server.enableXsrfProtection", "false", "--browser.gatherUsageStats", "false",
+           "--global.minCachedMessageSize", str(1 << 30)]  # always send full messages; we don't cache them
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"streamlit exited: {proc.stderr.read().decode()[-2000:]}")
+        try:
+            with urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1) as r:
+                if r.status == 200: return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("streamlit did not become healthy within 60s")
+
+
+def rss_mb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"): return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# --- SESSIONS ---
+class Session:
+    """Speaks Streamlit's websocket protocol the way a browser tab does."""
+
+    def __init__(self, url, timeout):
+        self.url = url
+        self.timeout = timeout
+        self.widgets = {}  # user key (or label for keyless widgets) -> (element type, proto, fragment_id)
+        self.state = {}    # widget id -> WidgetState resent on every rerun, like the frontend
+        self.errors = []
+
+    async def __aenter__(self):
+        self.ws = await websockets.connect(self.url, subprotocols=["streamlit"], max_size=None)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.ws.close()
+
+    def widget(self, name):
+        if name not in self.widgets: raise KeyError(f"widget {name!r} not rendered")
+        return self.widgets[name]
+
+    def set_value(self, name, field, value):
+        _, proto, fragment_id = self.widget(name)
+        ws = WidgetState(id=proto.id)
+        if field == "string_array_value": ws.string_array_value.data.extend(value)
+        else: setattr(ws, field, value)
+        self.state[proto.id] = ws
+        return fragment_id
+
+    async def rerun(self, fragment_id="", triggers=()):
+        msg = BackMsg()
+        client_state = msg.rerun_script
+        client_state.widget_states.widgets.extend(list(self.state.values()) + list(triggers))
+        if fragment_id: client_state.fragment_id = fragment_id
+        started = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        await self._until_finished()
+        return time.perf_counter() - started
+
+    async def click(self, name):
+        _, proto, fragment_id = self.widget(name)
+        return await self.rerun(fragment_id, [WidgetState(id=proto.id, trigger_value=True)])
+
+    async def _until_finished(self):
+        while True:
+            raw = await asyncio.wait_for(self.ws.recv(), self.timeout)
+            msg = ForwardMsg()
+            msg.ParseFromString(raw)
+            kind = msg.WhichOneof("type")
+            if kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                self._on_element(msg.delta.new_element, msg.delta.fragment_id)
+            elif kind == "script_finished" and msg.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return
+
+    def _on_element(self, element, fragment_id):
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            self.errors.append(element.exception.message)
+            return
+        proto = getattr(element, kind)
+        widget_id = getattr(proto, "id", "")
+        if not widget_id.startswith("$$ID-"): return
+        user_key = widget_id.rsplit("-", 1)[-1]
+        name = user_key if user_key != "None" else getattr(proto, "label", widget_id)
+        self.widgets[name] = (kind, proto, fragment_id)
+
+
+async def run_session(session_no, url, timeout):
+    timings = []
+    async with Session(url, timeout) as s:
+        async def step(name, coro):
+            timings.append((name, await coro))
+
+        await step("open_home", s.rerun())
+        s.set_value("league_id_input", "string_value", LEAGUE_ID)
+        await step("enter_league", s.rerun())
+
+        s.set_value("nav", "string_value", PAGE_FANTASY)
+        await step("open_fantasy", s.rerun())
+        _, players, _ = s.widget("Search Players:")
+        picks = list(players.options)[session_no * 6 % max(len(players.options), 1):][:6]
+        await step("pick_roster", s.rerun(s.set_value("Search Players:", "string_array_value", picks)))
+        for frame in TIME_FRAMES:
+            await step(f"time_frame:{frame}", s.rerun(s.set_value("time_filter", "string_value", frame)))
+
+        s.set_value("nav", "string_value", PAGE_HOME)
+        await s.rerun()
+        ticker = sorted(name for name in s.widgets if name.startswith("tick_"))
+        if ticker:
+            s.state.pop(s.widget("nav")[1].id)  # the click's callback switches pages server-side
+            await step("open_gamecenter", s.click(ticker[session_no % len(ticker)]))
+        return timings, s.errors
+
+
+async def run_sessions(url, n, concurrency, timeout):
+    gate = asyncio.Semaphore(concurrency or n)
+    async def one(i):
+        async with gate:
+            return await run_session(i, url, timeout)
+    return await asyncio.gather(*(one(i) for i in range(n)), return_exceptions=True)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values: return 0.0
+    k = (len(values) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10, help="number of simulated sessions")
+    parser.add_argument("--concurrency", type=int, default=None, help="sessions running at once (default: all)")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds added to every upstream response")
+    parser.add_argument("--timeout", type=float, default=60, help="per-rerun timeout in seconds")
+    args = parser.parse_args(argv)
+
+    stub, counts = make_server(StubData(), args.latency)
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+    port = free_port()
+    app = start_app(port, {**os.environ, **upstream_env(stub.base_url)})
+    url = f"ws://127.0.0.1:{port}/_stcore/stream"
+    try:
+        # One untimed session first, so imports and warm caches land in the baseline, not the per-session figure
+        asyncio.run(run_session(0, url, args.timeout))
+        baseline = rss_mb(app.pid)
+        started = time.perf_counter()
+        results = asyncio.run(run_sessions(url, args.sessions, args.concurrency, args.timeout))
+        wall = time.perf_counter() - started
+        final = rss_mb(app.pid)
+    finally:
+        app.terminate()
+        stub.shutdown()
+
+    failures = [r for r in results if isinstance(r, BaseException)]
+    completed = [r for r in results if not isinstance(r, BaseException)]
+    app_errors = [e for _, errors in completed for e in errors]
+    latencies = [t for timings, _ in completed for _, t in timings]
+    by_step = {}
+    for timings, _ in completed:
+        for name, t in timings: by_step.setdefault(name, []).append(t)
+
+    print(f"Sessions: {len(completed)} ok, {len(failures)} failed   wall: {wall:.1f}s   upstream latency: {args.latency * 1000:.0f} ms")
+    print(f"Rerun latency  p50: {percentile(latencies, 0.5) * 1000:.0f} ms   p99: {percentile(latencies, 0.99) * 1000:.0f} ms   ({len(latencies)} reruns)")
+    for name, ts in by_step.items():
+        print(f"  {name:<32} p50 {percentile(ts, 0.5) * 1000:7.0f} ms   p99 {percentile(ts, 0.99) * 1000:7.0f} ms")
+    print(f"Server RSS  after warm-up: {baseline:.0f} MB   total: {final:.0f} MB   avg per session: {(final - baseline) / max(args.sessions, 1):.1f} MB")
+    print(f"Upstream requests: {sum(counts.values())}")
+    for endpoint, n in counts.most_common():
+        print(f"  {n:6d}  {endpoint}")
+    for e in (failures + app_errors)[:5]:
+        print(f"ERROR {e!r}")
+    return 1 if failures or app_errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Headless refresh of the shared datasets.
+
+Runs every loader in data_loader.py without Streamlit and writes the results into a
+DiskBackend cache directory. Point the app at the same directory with
+SLAPSHOT_CACHE_DIR and it serves these precomputed results instead of fetching them
+inside user requests. Each snapshot stays fresh for its dataset's TTL below (recorded
+in manifest.json), not the loader's shorter in-app TTL, so run the pipeline at least
+that often; once a snapshot expires the app falls back to fetching it itself.
+
+    python pipeline.py --out data/            # refresh everything
+    python pipeline.py --out data/ --only schedule nhl_news
+    python pipeline.py --out data/ --csv      # also export DataFrames as CSV
+    python pipeline.py --out data/ --assets   # also warm the local logo/image cache
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from cache import CACHE_DIR_ENV, DiskBackend, set_backend
+import data_loader as dl
+
+# name -> (cached loader, args, seconds the app serves the snapshot)
+DATASETS = {
+    "nhl_data": (dl.load_nhl_data, (), 6 * 3600),
+    "schedule": (dl.load_schedule, (), 15 * 60),
+    "weekly_leaders": (dl.load_weekly_leaders, (), 6 * 3600),
+    "weekly_schedule_matrix": (dl.get_weekly_schedule_matrix, (), 6 * 3600),
+    "nhl_news": (dl.load_nhl_news, (), 3600),
+    "standings_league": (dl.fetch_nhl_standings, ("League",), 3600),
+    "standings_conference": (dl.fetch_nhl_standings, ("Conference",), 3600),
+    "standings_division": (dl.fetch_nhl_standings, ("Division",), 3600),
+    "remaining_schedule": (dl.load_remaining_schedule, (), 12 * 3600),
+}
+
+
+def _looks_failed(value):
+    # Loaders swallow errors and return empty results (or raise); never overwrite a good snapshot with those.
+    if isinstance(value, pd.DataFrame): return value.empty
+    if isinstance(value, tuple):
+        # load_schedule returns ([], [], []) on error; any tuple with an empty frame or nothing at all is a failure
+        parts = [v for v in value if isinstance(v, (pd.DataFrame, list, dict))]
+        return any(isinstance(v, pd.DataFrame) and v.empty for v in parts) or all(len(v) == 0 for v in parts)
+    if isinstance(value, list): return not value
+    return value is None
+
+
+def _row_count(value):
+    if isinstance(value, pd.DataFrame): return len(value)
+    if isinstance(value, (list, tuple)): return sum(_row_count(v) if isinstance(v, (list, pd.DataFrame)) else 1 for v in value)
+    return 1
+
+
+def _export_csv(out_dir, name, value):
+    if isinstance(value, pd.DataFrame): frames = [value]
+    elif isinstance(value, tuple): frames = [v for v in value if isinstance(v, pd.DataFrame)]
+    else: frames = []
+    for i, frame in enumerate(frames):
+        suffix = f"_{i}" if len(frames) > 1 else ""
+        frame.to_csv(out_dir / f"{name}{suffix}.csv")
+
+
+def refresh(out_dir, names=None, export_csv=False):
+    out_dir = Path(out_dir)
+    set_backend(DiskBackend(out_dir))
+
+    manifest_path = out_dir / "manifest.json"
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+
+    ok = True
+    for name in names or DATASETS:
+        loader, args, ttl = DATASETS[name]
+        started = time.time()
+        try: value = loader.__wrapped__(*args)
+        except: value = None
+        elapsed = round(time.time() - started, 2)
+
+        if _looks_failed(value):
+            ok = False
+            print(f"  {name}: empty or failed result, keeping previous snapshot ({elapsed}s)")
+            manifest.setdefault(name, {})["last_error"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+            continue
+
+        loader.store(value, *args, ttl=ttl)
+        if export_csv: _export_csv(out_dir, name, value)
+        manifest[name] = {"updated": time.strftime("%Y-%m-%dT%H:%M:%S"), "rows": _row_count(value), "seconds": elapsed,
+                          "ttl": ttl, "expires": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(time.time() + ttl))}
+        print(f"  {name}: {manifest[name]['rows']} rows ({elapsed}s)")
+
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+    return ok
+
+
+def refresh_assets():
+    import assets
+    standings = dl.fetch_nhl_standings("League")
+    abbrevs = standings['Abbrev'].dropna().tolist() if not standings.empty else []
+    urls = [assets.TEAM_LOGO_URL.format(abbr=a) for a in abbrevs] + [a['image'] for a in dl.load_nhl_news()]
+    local = assets.warm(urls)
+    print(f"  assets: {local}/{len(urls)} served locally")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh Slapshot Stats datasets to disk.")
+    parser.add_argument("--out", default=os.environ.get(CACHE_DIR_ENV, "data"), help="output/cache directory")
+    parser.add_argument("--only", nargs="+", choices=list(DATASETS), help="refresh just these datasets")
+    parser.add_argument("--csv", action="store_true", help="also write DataFrames as CSV")
+    parser.add_argument("--assets", action="store_true", help="also download team logos and news images")
+    args = parser.parse_args(argv)
+
+    print(f"Refreshing datasets into {args.out}")
+    ok = refresh(args.out, args.only, args.csv)
+    if args.assets: refresh_assets()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import numpy as np
+import pandas as pd
+
+from cache import cache_data
+from data_loader import FINAL_STATES, fetch_nhl_standings, load_remaining_schedule_or_last, load_schedule
+
+# --- PLAYOFF ODDS (MONTE CARLO) ---
+# Simulates the rest of the regular season many times from the current standings.
+# Game model: each team's strength is its points percentage, regressed toward .500
+# while the sample is small. Home win probability is the log5 matchup plus a small
+# home edge. A game goes to OT/SO at the league's observed rate, and the loser there
+# gets a point. The observed share of those that reach a shootout decides whether the
+# win counts toward ROW.
+#
+# Everything runs as arrays shaped (sims x games) or (sims x teams). Points and win
+# counts come from matmuls with one-hot home/away incidence matrices. The ranking key
+# follows the NHL tiebreakers: points, regulation wins, regulation + OT wins, total
+# wins, then random jitter for the rest (head-to-head and goal differential).
+# Qualification uses the NHL format: top 3 in each division plus two wildcards per
+# conference.
+
+HOME_EDGE = 0.03
+REGRESS_GAMES = 10   # phantom .500 games mixed into each team's points percentage
+CHUNK = 2500         # simulations per batch, keeps the (sims x games) arrays small
+DEFAULT_OT_RATE = 0.23
+DEFAULT_SHOOTOUT_SHARE = 0.4  # of OT/SO games
+
+
+def _team_strength(standings):
+    gp = standings['GP'].to_numpy(dtype=float)
+    pts = standings['PTS'].to_numpy(dtype=float)
+    return (pts + REGRESS_GAMES) / (2 * (gp + REGRESS_GAMES))
+
+
+def _ot_rate(standings):
+    games = standings['GP'].sum() / 2
+    if games < 50: return DEFAULT_OT_RATE
+    return float(np.clip(standings['OTL'].sum() / games, 0.1, 0.35))
+
+
+def _shootout_share(standings):
+    # Every OT/SO game has exactly one OTL; shootout wins are the wins not in ROW
+    ot_games = standings['OTL'].sum()
+    if ot_games < 30 or not standings['ROW'].any(): return DEFAULT_SHOOTOUT_SHARE
+    return float(np.clip((standings['W'] - standings['ROW']).sum() / ot_games, 0.2, 0.6))
+
+
+def _rank_within(keys, cols):
+    """Rank (0 = best) of each team in `cols` among those columns, per simulation."""
+    order = np.argsort(-keys[:, cols], axis=1)
+    return np.argsort(order, axis=1)
+
+
+def simulate_season(standings, remaining, n_sims=20000, seed=None):
+    """Per-team playoff, division title and conference top seed odds, plus mean final points.
+
+    `standings` needs Abbrev, Team, Conference, Division, GP, W, PTS, OTL, RW, ROW;
+    `remaining` needs home and away abbrevs, one row per unplayed game.
+    """
+    standings = standings.drop_duplicates('Abbrev').reset_index(drop=True)
+    if 'ROW' not in standings: standings['ROW'] = standings['RW']  # snapshots from before ROW was fetched
+    teams = standings['Abbrev'].tolist()
+    n = len(teams)
+    slot = {t: i for i, t in enumerate(teams)}
+    remaining = remaining[remaining['home'].isin(slot) & remaining['away'].isin(slot)]
+
+    home = remaining['home'].map(slot).to_numpy()
+    away = remaining['away'].map(slot).to_numpy()
+    home_onehot = np.zeros((len(home), n), dtype=np.float32)
+    away_onehot = np.zeros((len(away), n), dtype=np.float32)
+    home_onehot[np.arange(len(home)), home] = 1
+    away_onehot[np.arange(len(away)), away] = 1
+
+    strength = _team_strength(standings)
+    ph, pa = strength[home], strength[away]
+    p_home = np.clip(ph * (1 - pa) / (ph * (1 - pa) + pa * (1 - ph)) + HOME_EDGE, 0.05, 0.95).astype(np.float32)
+    p_ot = _ot_rate(standings)
+    p_so = _shootout_share(standings)
+
+    base_pts = standings['PTS'].to_numpy(dtype=np.float32)
+    base_rw = standings['RW'].to_numpy(dtype=np.float32)
+    base_row = standings['ROW'].to_numpy(dtype=np.float32)
+    base_w = standings['W'].to_numpy(dtype=np.float32)
+    conferences = {c: np.flatnonzero(standings['Conference'].to_numpy() == c) for c in standings['Conference'].unique()}
+    divisions = {d: np.flatnonzero(standings['Division'].to_numpy() == d) for d in standings['Division'].unique()}
+
+    rng = np.random.default_rng(seed)
+    made = np.zeros(n)
+    div_title = np.zeros(n)
+    top_seed = np.zeros(n)
+    points_sum = np.zeros(n)
+    done = 0
+    while done < n_sims:
+        s = min(CHUNK, n_sims - done)
+        home_win = rng.random((s, len(home)), dtype=np.float32) < p_home
+        overtime = rng.random((s, len(home)), dtype=np.float32) < p_ot
+        shootout = overtime & (rng.random((s, len(home)), dtype=np.float32) < p_so)
+        # Winner gets 2, an OT loser 1
+        home_pts = np.where(home_win, 2, overtime).astype(np.float32)
+        away_pts = np.where(home_win, overtime, 2).astype(np.float32)
+        pts = base_pts + home_pts @ home_onehot + away_pts @ away_onehot
+        # Wins by type: every win, regulation wins, and regulation + OT wins (no shootouts)
+        w = base_w + home_win.astype(np.float32) @ home_onehot + (~home_win).astype(np.float32) @ away_onehot
+        rw = base_rw + (home_win & ~overtime).astype(np.float32) @ home_onehot + (~home_win & ~overtime).astype(np.float32) @ away_onehot
+        row = base_row + (home_win & ~shootout).astype(np.float32) @ home_onehot + (~home_win & ~shootout).astype(np.float32) @ away_onehot
+        # Lexicographic key, 100 per level (no count reaches 100); float64 keeps every level exact
+        keys = ((pts.astype(np.float64) * 100 + rw) * 100 + row) * 100 + w + rng.random((s, n)) * 0.5
+
+        qualified = np.zeros((s, n), dtype=bool)
+        for cols in divisions.values():
+            rank = _rank_within(keys, cols)
+            qualified[:, cols] = rank < 3
+            div_title[cols] += (rank == 0).sum(axis=0)
+        for cols in conferences.values():
+            conf_keys = keys[:, cols]
+            top_seed[cols] += (_rank_within(keys, cols) == 0).sum(axis=0)
+            # Wildcards: best two in the conference outside their division's top three
+            wild_keys = np.where(qualified[:, cols], -np.inf, conf_keys)
+            wild_rank = np.argsort(np.argsort(-wild_keys, axis=1), axis=1)
+            qualified[:, cols] |= wild_rank < 2
+        made += qualified.sum(axis=0)
+        points_sum += pts.sum(axis=0)
+        done += s
+
+    return pd.DataFrame({
+        'Team': standings['Team'], 'Abbrev': teams, 'Conference': standings['Conference'], 'Division': standings['Division'],
+        'PTS': standings['PTS'], 'Proj PTS': (points_sum / n_sims).round(1),
+        'Playoffs %': (made / n_sims * 100).round(1), 'Division %': (div_title / n_sims * 100).round(1),
+        'Top Seed %': (top_seed / n_sims * 100).round(1),
+    }).sort_values(['Conference', 'Playoffs %', 'Proj PTS'], ascending=[True, False, False]).reset_index(drop=True)
+
+
+@cache_data(ttl=86400)
+def _playoff_odds(signature, n_sims):
+    standings = fetch_nhl_standings("League")
+    remaining = load_remaining_schedule_or_last()
+    # No full schedule yet: raise so nothing is cached, playoff_odds shows an empty table
+    if remaining is None: raise RuntimeError("remaining schedule unavailable")
+    if standings.empty: return pd.DataFrame()
+    final_ids = set(signature[1])
+    if not remaining.empty:
+        remaining = remaining[~remaining['game_state'].isin(FINAL_STATES) & ~remaining['id'].isin(final_ids)]
+    return simulate_season(standings, remaining, n_sims, seed=signature[0])
+
+
+def playoff_odds(n_sims=20000):
+    """Cached simulation, recomputed only when a game goes final (standings GP or today's finals change).
+
+    Empty until a full remaining schedule has loaded; a failed crawl is retried every few minutes.
+    """
+    standings = fetch_nhl_standings("League")
+    if standings.empty: return pd.DataFrame()
+    games_yesterday, games_today, _ = load_schedule()
+    final_ids = tuple(sorted(g['id'] for g in games_yesterday + games_today if g.get('game_state') in FINAL_STATES))
+    try: return _playoff_odds((int(standings['GP'].sum()), final_ids), n_sims)
+    except: return pd.DataFrame()
@@ -0,0 +1,36 @@
+"""ASGI entry point: `streamlit run serve.py`.
+
+Runs app.py unchanged and adds long-lived cache headers to the local asset cache
+(see assets.py). Streamlit's own static serving sends no Cache-Control, so every page
+view would revalidate every logo.
+"""
+import streamlit as st
+from starlette.middleware import Middleware
+
+ASSET_PATH = "/app/static/assets/"
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+
+class AssetCacheHeaders:
+    """Marks versioned (`?v=`) asset responses immutable; the URL changes whenever the file does."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or ASSET_PATH not in scope["path"] or b"v=" not in scope.get("query_string", b""):
+            return await self.app(scope, receive, send)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start" and message["status"] == 200:
+                headers = [(k, v) for k, v in message.get("headers", []) if k.lower() != b"cache-control"]
+                headers.append((b"cache-control", f"public, max-age={ASSET_MAX_AGE}, immutable".encode()))
+                if scope["path"].endswith(".svg"):  # logos are only ever used as <img> sources
+                    headers = [(k, v) for k, v in headers if k.lower() != b"content-type"] + [(b"content-type", b"image/svg+xml")]
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+app = st.App("app.py", middleware=[Middleware(AssetCacheHeaders)])
@@ -0,0 +1,43 @@
+from live import _GameState
+
+HOME, AWAY = 1, 2
+
+
+def play(sort, kind, **details):
+    return {'eventId': sort, 'sortOrder': sort, 'typeDescKey': kind, 'situationCode': '1551',
+            'periodDescriptor': {'periodType': 'REG'}, 'details': {'eventOwnerTeamId': HOME, **details}}
+
+
+def goal(sort, scorer, assist=None):
+    return play(sort, 'goal', scoringPlayerId=scorer, assist1PlayerId=assist, goalieInNetId=99)
+
+
+def feed(*plays):
+    return {'gameState': 'LIVE', 'homeTeam': {'id': HOME, 'abbrev': 'HOM'}, 'awayTeam': {'id': AWAY, 'abbrev': 'AWY'},
+            'rosterSpots': [], 'plays': list(plays)}
+
+
+def test_only_new_plays_are_applied():
+    state = _GameState(1)
+    assert state.ingest(feed(play(1, 'hit', hittingPlayerId=10), goal(2, 11, 12))) == 2
+    assert state.ingest(feed(play(1, 'hit', hittingPlayerId=10), goal(2, 11, 12))) == 0
+    assert state.ingest(feed(play(1, 'hit', hittingPlayerId=10), goal(2, 11, 12), goal(3, 11))) == 1
+    assert state.counters[11]['G'] == 2 and state.counters[12]['A'] == 1 and state.counters[10]['Hits'] == 1
+
+
+def test_revised_goal_replays_the_game():
+    state = _GameState(1)
+    state.ingest(feed(goal(1, 11, 12), play(2, 'hit', hittingPlayerId=10)))
+    # Review moves the assist; no new plays
+    state.ingest(feed(goal(1, 11, 13), play(2, 'hit', hittingPlayerId=10)))
+    assert state.counters[12]['A'] == 0 and state.counters[13]['A'] == 1
+    assert state.counters[11]['G'] == 1 and state.counters[10]['Hits'] == 1
+
+
+def test_removed_goal_replays_the_game():
+    state = _GameState(1)
+    state.ingest(feed(goal(1, 11, 12), play(2, 'hit', hittingPlayerId=10)))
+    # Overturned goal disappears while a new play arrives
+    state.ingest(feed(play(2, 'hit', hittingPlayerId=10), play(3, 'hit', hittingPlayerId=10)))
+    assert state.counters[11]['G'] == 0 and state.counters[12]['A'] == 0 and state.counters[99]['GA'] == 0
+    assert state.counters[10]['Hits'] == 2
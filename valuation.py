@@ -0,0 +1,118 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from cache import cache_resource
+from data_loader import load_nhl_data
+
+# --- CATEGORY LEAGUE VALUATION ---
+# Per-category z-scores and percentile ranks against a player pool (the top
+# `skater_pool` skaters by ice time, the top `goalie_pool` goalies by games played).
+# Rate stats are volume-weighted: a player's SV% counts in proportion to shots faced
+# and GAA in proportion to games played, so a 3-game .950 goalie can't top the table.
+#
+# The engine memoizes every (category, pool size) column. Changing the chosen
+# categories only computes the new ones, and a pool-size change only recomputes the
+# columns for that position group.
+
+SKATER_CATEGORIES = ['G', 'A', 'PPP', 'SOG', 'Hits', 'BkS']
+GOALIE_CATEGORIES = ['W', 'SV%', 'GAA', 'SO']
+LOWER_IS_BETTER = {'GAA'}
+
+
+class CategoryEngine:
+    def __init__(self, stats):
+        self.stats = stats.reset_index(drop=True)
+        self._is_goalie = (self.stats['PosType'] == 'Goalie').to_numpy()
+        gp = pd.to_numeric(self.stats['GP'], errors='coerce').fillna(0).to_numpy(dtype=float)
+        toi = pd.to_numeric(self.stats.get('TOI', 0), errors='coerce').fillna(0).to_numpy(dtype=float)
+        shots_against = (self.stats['Svs'] + self.stats['GA']).to_numpy(dtype=float)
+        self._volume = {'Skater': gp * toi, 'Goalie': gp}
+        self._rate_volume = {'SV%': shots_against, 'GAA': gp}
+        self._pools = {}
+        self._columns = {}  # (category, pool size) -> (z, percentile) arrays over every row
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, pos_type, size):
+        key = (pos_type, size)
+        if key not in self._pools:
+            eligible = self._is_goalie if pos_type == 'Goalie' else ~self._is_goalie
+            volume = np.where(eligible, self._volume[pos_type], -np.inf)
+            top = np.argsort(-volume, kind='stable')[:min(size, int(eligible.sum()))]
+            mask = np.zeros(len(volume), dtype=bool)
+            mask[top] = True
+            self._pools[key] = mask
+        return self._pools[key]
+
+    def _raw(self, categories, pool):
+        """(rows x categories) matrix of the values to z-score; rate stats become volume-weighted impact."""
+        cols = []
+        for cat in categories:
+            x = pd.to_numeric(self.stats[cat], errors='coerce').fillna(0).to_numpy(dtype=float)
+            if cat in self._rate_volume:
+                w = self._rate_volume[cat]
+                pool_rate = np.average(x[pool], weights=w[pool]) if w[pool].sum() > 0 else 0.0
+                x = (x - pool_rate) * w / max(w[pool].mean(), 1e-9)
+            if cat in LOWER_IS_BETTER: x = -x
+            cols.append(x)
+        return np.column_stack(cols)
+
+    def _compute(self, categories, pos_type, size):
+        # All missing columns of one position group in a single vectorized pass
+        pool = self._pool(pos_type, size)
+        raw = self._raw(categories, pool)
+        members = raw[pool]
+        mean = members.mean(axis=0)
+        std = members.std(axis=0)
+        z = (raw - mean) / np.where(std > 0, std, 1.0)
+        ranked = np.sort(members, axis=0)
+        for j, cat in enumerate(categories):
+            pct = np.searchsorted(ranked[:, j], raw[:, j], side='right') / max(len(ranked), 1) * 100
+            self._columns[(cat, size)] = (z[:, j], pct)
+
+    def columns(self, categories, skater_pool, goalie_pool):
+        with self._lock:
+            for pos_type, cats, size in (('Skater', SKATER_CATEGORIES, skater_pool), ('Goalie', GOALIE_CATEGORIES, goalie_pool)):
+                missing = [c for c in categories if c in cats and (c, size) not in self._columns]
+                if missing: self._compute(missing, pos_type, size)
+            return {c: self._columns[(c, skater_pool if c in SKATER_CATEGORIES else goalie_pool)] for c in categories}
+
+    def value_table(self, categories, skater_pool=300, goalie_pool=60):
+        """ID/Player/Team/Pos plus z_<cat>, pct_<cat>, Value (sum of z) and Value% for every player."""
+        categories = tuple(c for c in dict.fromkeys(categories) if c in SKATER_CATEGORIES + GOALIE_CATEGORIES)
+        key = (categories, skater_pool, goalie_pool)
+        with self._lock:
+            if key in self._tables: return self._tables[key]
+
+        cols = self.columns(categories, skater_pool, goalie_pool)
+        table = self.stats[['ID', 'Player', 'Team', 'Pos', 'PosType']].copy()
+        value = np.zeros(len(table))
+        for cat, (z, pct) in cols.items():
+            applies = self._is_goalie if cat in GOALIE_CATEGORIES else ~self._is_goalie
+            table[f'z_{cat}'] = np.where(applies, z, np.nan).round(2)
+            table[f'pct_{cat}'] = np.where(applies, pct, np.nan).round(1)
+            value += np.where(applies, z, 0.0)
+        table['Value'] = value.round(2)
+        # Percentile of Value within each position group's pool
+        table['Value%'] = np.nan
+        for pos_type, size in (('Skater', skater_pool), ('Goalie', goalie_pool)):
+            group = (self._is_goalie if pos_type == 'Goalie' else ~self._is_goalie)
+            ranked = np.sort(value[self._pool(pos_type, size)])
+            if len(ranked):
+                table.loc[group, 'Value%'] = (np.searchsorted(ranked, value[group], side='right') / len(ranked) * 100).round(1)
+
+        with self._lock:
+            self._tables[key] = table
+        return table
+
+
+@cache_resource(ttl=3600)
+def get_category_engine():
+    return CategoryEngine(load_nhl_data())
+
+
+def category_values(categories, skater_pool=300, goalie_pool=60):
+    """Shared, cached value table for the roster, league and trade views. Treat it as read-only."""
+    return get_category_engine().value_table(tuple(categories), skater_pool, goalie_pool)
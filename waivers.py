@@ -0,0 +1,113 @@
+import bisect
+import heapq
+import threading
+from datetime import datetime
+
+import pandas as pd
+import pytz
+
+from cache import cache_resource
+from data_loader import fantasy_points, get_weekly_schedule_matrix, load_nhl_data, load_recent_stats
+
+# --- WAIVER WIRE ---
+# One index per (league, scoring) shared by every session. Each player is scored once
+# when the index is built:
+#   Score = blended FP/G (recent window and season) x games left this week
+# and kept in a per-position list sorted by score. Rosters are synced by diffing owned
+# NHL player IDs (as resolved by the league loader, so ESPN spellings and same-named
+# players don't matter); a pickup or drop moves only those players. Top-k
+# queries merge the head of each requested position's list.
+
+POSITIONS = ['C', 'L', 'R', 'D', 'G']
+SLOT_TARGETS = {'C': 2, 'L': 2, 'R': 2, 'D': 4, 'G': 2}  # ESPN default starting lineup
+RECENT_DAYS = 14
+RECENT_WEIGHT = 0.6
+
+
+def games_left_this_week(matrix):
+    """NHL team -> games left from today through the end of the schedule week."""
+    if matrix.empty: return {}
+    days = list(matrix.columns)
+    # NHL days are Eastern; the server clock is usually UTC, which turns over mid-evening
+    today = datetime.now(pytz.utc).astimezone(pytz.timezone('US/Eastern')).strftime("%A")
+    upcoming = days[days.index(today):] if today in days else days
+    return (matrix[upcoming] != "").sum(axis=1).to_dict()
+
+
+def score_players(weights, recent_days=RECENT_DAYS):
+    """Season table with Season FP/G, Recent FP/G, Games Left and Score for every player."""
+    season = load_nhl_data()
+    if season.empty: return season
+    recent = load_recent_stats(recent_days)
+    matrix, _ = get_weekly_schedule_matrix()
+
+    df = season[['ID', 'Player', 'Team', 'Pos', 'PosType', 'GP']].copy()
+    df['Season FP/G'] = (fantasy_points(season, weights) / season['GP'].where(season['GP'] > 0)).fillna(0)
+    if not recent.empty:
+        recent = recent.drop_duplicates('ID')
+        recent_fpg = (fantasy_points(recent, weights) / recent['GP'].where(recent['GP'] > 0))
+        df['Recent FP/G'] = df['ID'].map(pd.Series(recent_fpg.to_numpy(), index=recent['ID']))
+    else:
+        df['Recent FP/G'] = float('nan')
+    # No recent games -> fall back to the season rate
+    blended = RECENT_WEIGHT * df['Recent FP/G'].fillna(df['Season FP/G']) + (1 - RECENT_WEIGHT) * df['Season FP/G']
+    df['Games Left'] = df['Team'].map(games_left_this_week(matrix)).fillna(0).astype(int)
+    df['Score'] = (blended * df['Games Left']).round(2)
+    df['Season FP/G'] = df['Season FP/G'].round(2)
+    df['Recent FP/G'] = df['Recent FP/G'].round(2)
+    return df
+
+
+def roster_needs(roster_positions):
+    """Open starting slots per position for a roster given as a list of position codes."""
+    counts = pd.Series(roster_positions, dtype=object).value_counts().to_dict()
+    return {pos: target - counts.get(pos, 0) for pos, target in SLOT_TARGETS.items() if target > counts.get(pos, 0)}
+
+
+class FreeAgentIndex:
+    def __init__(self, scored):
+        self.table = scored.drop_duplicates('ID').set_index('ID')
+        self._lists = {pos: [] for pos in POSITIONS}  # ascending (-score, ID): best first
+        self._entry = {}
+        self._owned = set()
+        self._lock = threading.Lock()
+        for pid, row in self.table.iterrows():
+            pos = row['Pos'] if row['Pos'] in self._lists else 'C'
+            self._entry[int(pid)] = (pos, (-float(row['Score']), int(pid)))
+        for pos, entry in self._entry.values():
+            self._lists[pos].append(entry)
+        for entries in self._lists.values():
+            entries.sort()
+
+    def sync(self, owned):
+        """Bring the index in line with the league's rostered NHL player IDs; returns (added, removed) counts."""
+        owned = {int(pid) for pid in owned} & self._entry.keys()
+        with self._lock:
+            picked_up = owned - self._owned
+            dropped = self._owned - owned
+            for pid in picked_up:
+                pos, entry = self._entry[pid]
+                entries = self._lists[pos]
+                i = bisect.bisect_left(entries, entry)
+                if i < len(entries) and entries[i] == entry: del entries[i]
+            for pid in dropped:
+                pos, entry = self._entry[pid]
+                bisect.insort(self._lists[pos], entry)
+            self._owned = owned
+        return len(dropped), len(picked_up)
+
+    def top(self, k=10, positions=None):
+        """Best `k` unowned players across `positions` (all by default)."""
+        with self._lock:
+            heads = [self._lists[p][:k] for p in (positions or POSITIONS) if p in self._lists]
+        ids = [entry[1] for entry in heapq.merge(*heads)][:k]
+        return self.table.loc[ids].reset_index()
+
+    def for_needs(self, needs, k=5):
+        """{position: top-k free agents} for each open slot, most-needed position first."""
+        return {pos: self.top(k, [pos]) for pos, _ in sorted(needs.items(), key=lambda kv: -kv[1])}
+
+
+@cache_resource(ttl=1800)
+def get_waiver_index(league_id, weights):
+    return FreeAgentIndex(score_players(weights))